@@ -3,15 +3,28 @@ from field import Field
 from util import ArmedTimer, GameObject
 import random
 from itertools import cycle
+import time
+from path_planner import PathPlanner
 
 
 class TankAI:
+    """
+    The random walker: drives in a random direction for a random time, fires whenever it can.
+
+    A variant of the enemy AI is a subclass: EnemyFractionAI makes one for every enemy tank
+    with create(), calls update() every tick and decide() when wants_to_decide, within its budget.
+    """
+    NAME = 'walker'
     SPAWNING_DELAY = 1.5
     FIRE_TIMER = 1.0
+    DIR_DELAY = (0.3, 3.0)
+
+    @classmethod
+    def create(cls, tank: Tank, fraction: 'EnemyFractionAI'):
+        return cls(tank, fraction.field, fraction.random)
 
-    @staticmethod
-    def dir_delay():
-        return random.uniform(0.3, 3.0)
+    def dir_delay(self):
+        return self.random.uniform(*self.DIR_DELAY)
 
     def pick_direction(self):
         c, r = self.field.map.col_row_from_coords(*self.tank.position)
@@ -26,19 +39,23 @@ class TankAI:
             prohibited_dir.add(Direction.RIGHT)
         if r >= self.field.map.height - 2:
             prohibited_dir.add(Direction.DOWN)
-        choices = list(Direction.all() - prohibited_dir)
+        # not a set difference: the order of a set of enums changes with the hash seed,
+        # and seeded games (replays) must pick the same directions
+        choices = [d for d in Direction if d not in prohibited_dir]
         if not choices:
             # fallback: allow any direction if we filtered out all
-            choices = list(Direction.all())
-        return random.choice(choices)
+            choices = list(Direction)
+        return self.random.choice(choices)
 
-    def __init__(self, tank: Tank, field: Field):
+    def __init__(self, tank: Tank, field: Field, rng: random.Random):
         self.tank = tank
         self.field = field
+        self.random = rng
 
         self.fire_timer = ArmedTimer(delay=self.FIRE_TIMER)
         self.dir_timer = ArmedTimer(delay=self.dir_delay())
         self.spawn_timer = ArmedTimer(delay=self.SPAWNING_DELAY)
+        self.waited = 0  # ticks the due decision was put off by the budget
 
     def _destroy(self):
         self.tank.to_destroy = True
@@ -49,7 +66,23 @@ class TankAI:
         else:
             self._destroy()
 
+    @property
+    def wants_to_decide(self):
+        return not self.tank.is_spawning and (self.fire_timer.done or self.dir_timer.done)
+
+    def decide(self):
+        """firing and picking a direction, EnemyFractionAI calls it within its time budget"""
+        if self.fire_timer.tick():
+            self.tank.fire()
+            self.fire_timer.start()
+
+        if self.dir_timer.tick():
+            self.tank.direction = self.pick_direction()
+            self.dir_timer.delay = self.dir_delay()
+            self.dir_timer.start()
+
     def update(self):
+        """every tick: spawning, hits and moving with the current heading"""
         if self.tank.is_spawning:
             if self.spawn_timer.tick():
                 if self.field.oc_map.test_rect(self.tank.bounding_rect, good_values=(None, self.tank)):
@@ -66,35 +99,126 @@ class TankAI:
                 self._destroy()
             self.tank.hit = False
 
+        self.tank.move_tank(self.tank.direction)
+
+    def reset(self):
+        self.tank.direction = Direction.random(self.random)
+
+
+class HunterTankAI(TankAI):
+    """
+    The hunter (from pytankbattle-main): goes to the base or the player by A*,
+    turns to them and fires when nothing solid is in between.
+    """
+    NAME = 'hunter'
+    DIR_DELAY = (0.3, 1.0)
+
+    @classmethod
+    def create(cls, tank: Tank, fraction: 'EnemyFractionAI'):
+        return cls(tank, fraction.field, fraction.random, fraction)
+
+    def __init__(self, tank: Tank, field: Field, rng: random.Random, fraction: 'EnemyFractionAI'):
+        super().__init__(tank, field, rng)
+        self.fraction = fraction
+
+    def cell_of(self, point):
+        """:return: col, row of the top-left cell of a 2 x 2 object centered at the point"""
+        c, r = self.field.map.col_row_from_coords(*point)
+        return c - 1, r - 1
+
+    def clear_line(self, target_pos):
+        field_map = self.field.map
+        c1, r1 = field_map.col_row_from_coords(*self.tank.position)
+        c2, r2 = field_map.col_row_from_coords(*target_pos)
+
+        if c1 == c2:
+            step = 1 if r2 > r1 else -1
+            cells = ((c1, r) for r in range(r1 + step, r2, step))
+        elif r1 == r2:
+            step = 1 if c2 > c1 else -1
+            cells = ((c, r1) for c in range(c1 + step, c2, step))
+        else:
+            return False
+        return not any(field_map.get_cell_by_col_row(c, r).solid for c, r in cells)
+
+    def align_direction_to(self, target_pos):
+        tx, ty = target_pos
+        x, y = self.tank.position
+        if abs(tx - x) > abs(ty - y):
+            self.tank.direction = Direction.RIGHT if tx > x else Direction.LEFT
+        else:
+            self.tank.direction = Direction.DOWN if ty > y else Direction.UP
+
+    def decide(self):
+        targets = self.fraction.target_points()  # the base goes first
+
         if self.fire_timer.tick():
+            target = next((p for p in targets if self.clear_line(p)), None)
+            if target is not None:
+                self.align_direction_to(target)
             self.tank.fire()
             self.fire_timer.start()
 
         if self.dir_timer.tick():
-            self.tank.direction = self.pick_direction()
+            path = self.fraction.planner.plan(self.cell_of(self.tank.position), [self.cell_of(p) for p in targets])
+            self.tank.direction = path[0] if path else self.pick_direction()
             self.dir_timer.delay = self.dir_delay()
             self.dir_timer.start()
 
-        self.tank.move_tank(self.tank.direction)
+    def update(self):
+        tank = self.tank
+        if tank.moving and tank.position == tank.old_position and not tank.is_spawning and not tank.to_destroy:
+            # the game undid the last move, stuck: turn at once, a new path on the next decision
+            tank.direction = self.pick_direction()
+            self.dir_timer.stop()
+        super().update()
 
-    def reset(self):
-        self.tank.direction = Direction.random()
+
+# enemy AI variants by name, see Game(enemy_ai=) and compare_ai.py
+TANK_AIS = {ai.NAME: ai for ai in (TankAI, HunterTankAI)}
 
 
 class EnemyFractionAI:
     MAX_ENEMIES = 5
     RESPAWN_TIMER = 5.0
 
-    def __init__(self, field: Field, tanks: GameObject, total_enemies=None):
+    # decisions (TankAI.decide) per tick are limited by time and by count;
+    # the ones put off wait for the next tick, tanks keep moving meanwhile
+    DECISION_BUDGET_US = 2000
+    MAX_DECISIONS_PER_TICK = 64
+    # a put off decision gets ahead of the tanks this much farther from the targets per tick
+    DECISION_AGING_PX = 32
+
+    def __init__(self, field: Field, tanks: GameObject, total_enemies=None, decision_budget_us=DECISION_BUDGET_US,
+                 max_enemies=MAX_ENEMIES, spawn_burst=1, rng=None, tank_ai=TankAI):
         """
         total_enemies: if None => infinite spawn (old behavior).
         if integer => total number of enemy tanks available to spawn in this level.
+        decision_budget_us: None => only MAX_DECISIONS_PER_TICK limits the decisions,
+        the game then does not depend on the speed of the machine (replays).
+        max_enemies: enemies alive at the same time.
+        spawn_burst: tanks spawned at once (at different spawn points) when the spawn timer fires.
+        rng: random.Random of the game, the enemies and their tanks take all random numbers from it.
+        tank_ai: TankAI or its subclass (see TANK_AIS), drives every enemy tank.
         """
+        self.random = rng if rng is not None else random.Random()
+        self.tank_ai = tank_ai
+        self.planner = PathPlanner(field.map)
         self.tanks = tanks
         self.field = field
-        self.spawn_points = {
-            (x, y): None for x, y in field.respawn_points(True)
-        }
+        self.max_enemies = max_enemies
+        self.spawn_burst = spawn_burst
+        self.decision_budget_us = decision_budget_us
+        self._base_point = field.get_center_of_cell(*(v + 1 for v in field.base_location))
+
+        # decision statistics
+        self.decisions = 0
+        self.deferred_decisions = 0
+        self.decision_ns = 0
+        self.max_decision_ns = 0
+
+        self.spawn_points = {}
+        self.set_spawn_points(field.respawn_points(True))
         self.spawn_timer = ArmedTimer(self.RESPAWN_TIMER)
 
         self.enemy_queue = cycle([
@@ -132,9 +256,9 @@ class EnemyFractionAI:
         new_tank = Tank(Tank.ENEMY, Tank.Color.PLAIN, t_type)
         new_tank.is_spawning = True
 
-        new_tank.ai = TankAI(new_tank, self.field)
+        new_tank.ai = self.tank_ai.create(new_tank, self)
 
-        if random.uniform(0, 1) > 0.35:
+        if self.random.uniform(0, 1) > 0.35:
             new_tank.is_bonus = True
 
         new_tank.place(self.field.get_center_of_cell(*pos))
@@ -146,6 +270,10 @@ class EnemyFractionAI:
 
         return new_tank
 
+    def set_spawn_points(self, points):
+        """points: (col, row) of cell corners where the center of a new tank is placed"""
+        self.spawn_points = {p: self.spawn_points.get(p) for p in points}
+
     def try_to_spawn_tank(self):
         free_locations = list()
         for loc, tank in list(self.spawn_points.items()):
@@ -155,9 +283,14 @@ class EnemyFractionAI:
             else:
                 free_locations.append(loc)
 
-        # If there are free spawn spots, less than max enemies alive, and we still have enemies to spawn
-        if free_locations and len(self.all_enemies) < self.MAX_ENEMIES and self.has_more_enemies:
-            pos = random.choice(free_locations)
+        # up to spawn_burst tanks at free spawn spots while there are less than max enemies alive
+        # and we still have enemies to spawn
+        n = min(self.spawn_burst, len(free_locations), self.max_enemies - len(self.all_enemies))
+        for _ in range(n):
+            if not self.has_more_enemies:
+                break
+            pos = self.random.choice(free_locations)
+            free_locations.remove(pos)
             tank = self.get_next_enemy(pos)
             if tank:
                 self.spawn_points[pos] = tank
@@ -167,12 +300,53 @@ class EnemyFractionAI:
         for t in self.all_enemies:
             t.stop()
 
+    def target_points(self):
+        return [self._base_point, *(t.center_point for t in self.tanks if t.fraction == Tank.FRIEND)]
+
+    def make_decisions(self, enemies):
+        due = [t for t in enemies if t.ai.wants_to_decide]
+        if not due:
+            return
+
+        if len(due) > 1:
+            # the closest to the player or the base first; the long waiting ones get ahead
+            targets = self.target_points()
+            aging = self.DECISION_AGING_PX
+
+            def priority(t):
+                x, y = t.center_point
+                return min(abs(x - tx) + abs(y - ty) for tx, ty in targets) - t.ai.waited * aging
+            due.sort(key=priority)
+
+        clock = time.perf_counter_ns
+        deadline = None if self.decision_budget_us is None else clock() + self.decision_budget_us * 1000
+        for i, t in enumerate(due):
+            if i >= self.MAX_DECISIONS_PER_TICK or (deadline is not None and clock() > deadline):
+                for rest in due[i:]:
+                    rest.ai.waited += 1
+                self.deferred_decisions += len(due) - i
+                break
+            t0 = clock()
+            t.ai.decide()
+            dt = clock() - t0
+            t.ai.waited = 0
+            self.decisions += 1
+            self.decision_ns += dt
+            if dt > self.max_decision_ns:
+                self.max_decision_ns = dt
+
+    @property
+    def mean_decision_us(self):
+        return self.decision_ns / self.decisions / 1000 if self.decisions else 0.0
+
     def update(self):
         if self.spawn_timer.tick():
             self.spawn_timer.start()
             self.try_to_spawn_tank()
 
-        for enemy_tank in self.all_enemies:
+        enemies = self.all_enemies
+        self.make_decisions(enemies)
+        for enemy_tank in enemies:
             self.update_one_tank(enemy_tank)
 
     def update_one_tank(self, t: Tank):
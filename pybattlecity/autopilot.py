@@ -0,0 +1,129 @@
+"""
+A heuristic driver for the player tank, for headless runs, soak tests and benchmarks.
+
+It gives replay.TickInput like the keyboard does, so a game driven by it can be recorded
+and replayed. It takes no random numbers: a seeded game with the autopilot plays the same way.
+"""
+from config import CELL_SIZE
+from replay import TickInput, IDLE
+from util import Direction
+
+
+class Autopilot:
+    """
+    tick -> TickInput, call it on every tick (like Recording.inputs()).
+    The goals, in this order: enemies coming close to the base, bonuses nearby, the nearest enemy;
+    with nothing to do it waits in front of the base.
+    Enemies are shot along a row or a column: the tank gets in line with them first.
+    Bricks in the way are shot through, a stuck tank makes a detour.
+    """
+    DEFEND_RADIUS = CELL_SIZE * 8  # enemies this close to the base go first
+    BONUS_RADIUS = CELL_SIZE * 10
+    ALIGN = 6  # close enough to a line to shoot along it
+    BASE_SAFE = CELL_SIZE * 2  # don't shoot when the base is in the line of fire this wide
+    RETARGET_TICKS = 15
+    STUCK_TICKS = 12  # firing at what blocks the tank before a detour
+    DETOUR_TICKS = 24
+    GUARD_CELLS = 4  # the waiting place is this many cells above the base
+
+    def __init__(self, game):
+        self.game = game
+        self._target = None  # Tank or Bonus
+        self._retarget_at = 0
+        self._last_pos = None
+        self._last_move = None
+        self._stuck = 0
+        self._detour = 0
+        self._detour_move = None
+        self._detour_side = 0
+
+    def pick_target(self, pos, enemies):
+        game = self.game
+        bx, by = game.my_base.center_point
+        near_base = [t for t in enemies if abs(t.position[0] - bx) + abs(t.position[1] - by) < self.DEFEND_RADIUS]
+        if near_base:
+            return min(near_base, key=lambda t: abs(t.position[0] - bx) + abs(t.position[1] - by))
+
+        x, y = pos
+        bonuses = [b for b in game.bonuses if abs(b.center_point[0] - x) + abs(b.center_point[1] - y) < self.BONUS_RADIUS]
+        if bonuses:
+            return min(bonuses, key=lambda b: abs(b.center_point[0] - x) + abs(b.center_point[1] - y))
+
+        if enemies:
+            return min(enemies, key=lambda t: abs(t.position[0] - x) + abs(t.position[1] - y))
+        return None
+
+    def base_in_line(self, pos, move):
+        x, y = pos
+        bx, by = self.game.my_base.center_point
+        vx, vy = move.vector
+        if vx == 0:
+            return abs(bx - x) < self.BASE_SAFE and (by - y) * vy > 0
+        return abs(by - y) < self.BASE_SAFE and (bx - x) * vx > 0
+
+    @staticmethod
+    def toward(delta, negative, positive):
+        return negative if delta < 0 else positive
+
+    def steer(self, pos, goal, shoot):
+        """:return: move, fire"""
+        dx, dy = goal[0] - pos[0], goal[1] - pos[1]
+        if shoot:
+            if abs(dx) <= self.ALIGN:
+                return self.toward(dy, Direction.UP, Direction.DOWN), True
+            if abs(dy) <= self.ALIGN:
+                return self.toward(dx, Direction.LEFT, Direction.RIGHT), True
+            # get in line with the target: along the shorter distance
+            horizontal = abs(dx) < abs(dy)
+        else:
+            if abs(dx) <= self.ALIGN and abs(dy) <= self.ALIGN:
+                return None, False
+            horizontal = abs(dx) >= abs(dy)
+        if horizontal:
+            return self.toward(dx, Direction.LEFT, Direction.RIGHT), False
+        return self.toward(dy, Direction.UP, Direction.DOWN), False
+
+    def __call__(self, tick) -> TickInput:
+        game = self.game
+        tank = game.my_tank
+        if tank is None or game.is_game_over:
+            return IDLE
+        pos = tank.center_point
+
+        if self._last_move is not None and pos == self._last_pos:
+            self._stuck += 1
+        else:
+            self._stuck = 0
+        self._last_pos = pos
+
+        if self._detour:
+            self._detour -= 1
+            move, fire = self._detour_move, True
+        else:
+            enemies = [t for t in game.ai.all_enemies if not t.is_spawning]
+            target = self._target
+            if target is None or tick >= self._retarget_at or (target not in enemies and target not in game.bonuses):
+                target = self._target = self.pick_target(pos, enemies)
+                self._retarget_at = tick + self.RETARGET_TICKS
+
+            if target is None:
+                bx, by = game.my_base.center_point
+                move, fire = self.steer(pos, (bx, by - CELL_SIZE * self.GUARD_CELLS), shoot=False)
+            else:
+                move, fire = self.steer(pos, target.center_point, shoot=target in enemies)
+
+            if move is not None and self._stuck:
+                fire = True  # bricks or a tank in the way
+                if self._stuck >= self.STUCK_TICKS:
+                    # go around: to the sides in turn
+                    vx, vy = move.vector
+                    sides = (Direction.LEFT, Direction.RIGHT) if vx == 0 else (Direction.UP, Direction.DOWN)
+                    self._detour_side ^= 1
+                    move = self._detour_move = sides[self._detour_side]
+                    self._detour = self.DETOUR_TICKS
+                    self._stuck = 0
+
+        if fire and move is not None and self.base_in_line(pos, move):
+            fire = False
+        self._last_move = move
+        return TickInput(move, fire, False)
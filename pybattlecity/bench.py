@@ -0,0 +1,283 @@
+"""
+Headless benchmark of the simulation core.
+
+Every scenario builds a seeded game with a fixed-step clock, runs it for a fixed number
+of ticks and reports:
+ticks per second (uninstrumented run), time per phase / hot function (instrumented run)
+and memory allocations (tracemalloc run).
+
+    python3 bench.py --output bench.json
+    python3 bench.py --baseline bench.json  # exit code 1 on regression
+"""
+import argparse
+import datetime
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+from headless import init_headless
+import pygame
+from game import Game
+from field import CellType
+from levels import get_level_pack
+from config import TICK_TIME
+
+
+DEFAULT_TICKS = 300
+DEFAULT_SEED = 42
+DEFAULT_TOLERANCE = 0.1
+
+# (name in report, how to get the object from the game, method name)
+HOT_FUNCTIONS = (
+    ('Field.intersect_rect', lambda g: g.field, 'intersect_rect'),
+    ('Field.check_hit', lambda g: g.field, 'check_hit'),
+    ('OccupancyMap.fill_rect', lambda g: g.field.oc_map, 'fill_rect'),
+    ('EnemyFractionAI.update', lambda g: g.ai, 'update'),
+)
+
+
+def add_enemies(game: Game, n):
+    positions = list(game.field.tank_positions())
+    for i in range(n):
+        tank = game.ai.get_next_enemy(positions[i % len(positions)])
+        tank.is_spawning = False
+        game.tanks.add_child(tank)
+
+
+def fire_at_will(game: Game):
+    for tank in game.tanks:
+        tank.fire_timer.delay = 0
+        if hasattr(tank, 'ai'):
+            tank.ai.fire_timer.delay = 0
+
+
+def keep_firing(game: Game):
+    for tank in game.tanks:
+        tank.want_to_fire = True
+
+
+def fill_with_bricks(game: Game):
+    m = game.field.map
+    for col in range(m.width):
+        for row in range(m.height):
+            m.set_cell_col_row(col, row, CellType.BRICK)
+    # pockets for the tanks
+    for col in range(2, m.width - 1, 4):
+        for row in range(2, m.height - 1, 4):
+            for dc in (0, 1):
+                for dr in (0, 1):
+                    m.set_cell_col_row(col - dc, row - dr, CellType.FREE)
+
+
+def setup_tanks(n):
+    def setup(game):
+        add_enemies(game, n)
+    return setup
+
+
+def setup_sustained_fire(game):
+    add_enemies(game, 50)
+    fire_at_will(game)
+    return keep_firing
+
+
+def setup_brick_destruction(game):
+    fill_with_bricks(game)
+    add_enemies(game, len(list(game.field.tank_positions())))
+    fire_at_will(game)
+    return keep_firing
+
+
+# name: (level name or factory, setup function); setup may return a per-tick hook
+SCENARIOS = {
+    'empty_map': (None, None),
+    'level1': ('level1', None),
+    'level2': ('level2', None),
+    'tanks_50': ('level1', setup_tanks(50)),
+    'tanks_200': ('level1', setup_tanks(200)),
+    'tanks_1000': (None, setup_tanks(1000)),
+    'sustained_fire': ('level1', setup_sustained_fire),
+    'brick_destruction': (None, setup_brick_destruction),
+    'large_map': (lambda: get_level_pack().get('level1').tiled(8, 8), setup_tanks(200)),
+}
+
+
+class CallTimer:
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def wrap(self, name, fn):
+        seconds, calls = self.seconds, self.calls
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            t0 = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                seconds[name] += clock() - t0
+                calls[name] += 1
+        return timed
+
+    def instrument(self, game: Game):
+        game.update_phases = [(name, self.wrap(f'phase.{name}', phase)) for name, phase in game.update_phases]
+        for name, getter, method in HOT_FUNCTIONS:
+            obj = getter(game)
+            setattr(obj, method, self.wrap(name, getattr(obj, method)))
+
+    def report(self, ticks):
+        return {
+            name: {
+                'calls': self.calls[name],
+                'ms_per_tick': round(self.seconds[name] * 1000.0 / ticks, 4),
+            } for name in sorted(self.seconds)
+        }
+
+
+def make_scenario(name, seed):
+    level, setup = SCENARIOS[name]
+    if callable(level):
+        level = level()
+    game = Game(level, fixed_step=TICK_TIME, seed=seed, decision_budget_us=None)
+    # keep the match going for the whole run: no game over, no victory
+    game.my_base.check_hit = lambda x, y: False
+    game.ai.total_to_spawn = None
+    on_tick = setup(game) if setup else None
+    return game, on_tick
+
+
+def run_ticks(game, ticks, on_tick=None, screen=None, call_timer=None):
+    clock = time.perf_counter
+    render = call_timer.wrap('render', game.render) if call_timer and screen else game.render
+    t0 = clock()
+    for _ in range(ticks):
+        if on_tick:
+            on_tick(game)
+        game.update()
+        if screen is not None:
+            render(screen)
+    return clock() - t0
+
+
+def run_scenario(name, ticks, seed, screen=None, allocations=True):
+    result = {'ticks': ticks}
+
+    game, on_tick = make_scenario(name, seed)
+    elapsed = run_ticks(game, ticks, on_tick, screen)
+    result['seconds'] = round(elapsed, 4)
+    result['ticks_per_second'] = round(ticks / elapsed, 2)
+    result['objects_at_end'] = game.scene.total_children - 1
+
+    game, on_tick = make_scenario(name, seed)
+    call_timer = CallTimer()
+    call_timer.instrument(game)
+    run_ticks(game, ticks, on_tick, screen, call_timer)
+    result['phases'] = call_timer.report(ticks)
+
+    if allocations:
+        game, on_tick = make_scenario(name, seed)
+        gc.collect()
+        gc_before = [s['collections'] for s in gc.get_stats()]
+        tracemalloc.start()
+        start_mem, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        run_ticks(game, ticks, on_tick, screen)
+        end_mem, peak_mem = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        gc_after = [s['collections'] for s in gc.get_stats()]
+        result['allocations'] = {
+            'peak_kib': round((peak_mem - start_mem) / 1024, 1),
+            'net_kib': round((end_mem - start_mem) / 1024, 1),
+            'gc_collections': [a - b for a, b in zip(gc_after, gc_before)],
+        }
+
+    return result
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    :return: list of scenario names which are slower than (1 - tolerance) * baseline
+    """
+    regressions = []
+    base_scenarios = baseline.get('scenarios', {})
+    print(f'{"scenario":<20}{"ticks/s":>12}{"baseline":>12}{"ratio":>8}')
+    for name, r in results['scenarios'].items():
+        b = base_scenarios.get(name)
+        if b is None:
+            print(f'{name:<20}{r["ticks_per_second"]:>12}{"-":>12}{"-":>8}')
+            continue
+        ratio = r['ticks_per_second'] / b['ticks_per_second']
+        mark = ''
+        if ratio < 1.0 - tolerance:
+            regressions.append(name)
+            mark = '  <-- regression'
+        print(f'{name:<20}{r["ticks_per_second"]:>12}{b["ticks_per_second"]:>12}{ratio:>8.2f}{mark}')
+    return regressions
+
+
+def print_results(results):
+    for name, r in results['scenarios'].items():
+        print(f'{name}: {r["ticks_per_second"]} ticks/s, {r["objects_at_end"]} objects')
+        for phase, p in r['phases'].items():
+            print(f'    {phase:<28}{p["ms_per_tick"]:>10.3f} ms/tick{p["calls"]:>10} calls')
+        if 'allocations' in r:
+            a = r['allocations']
+            print(f'    allocations: peak {a["peak_kib"]} KiB, net {a["net_kib"]} KiB, gc {a["gc_collections"]}')
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Benchmark of the simulation core')
+    parser.add_argument('--ticks', type=int, default=DEFAULT_TICKS)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--only', nargs='+', choices=sorted(SCENARIOS), help='run only these scenarios')
+    parser.add_argument('--render', action='store_true', help='render every tick to an off-screen surface')
+    parser.add_argument('--no-alloc', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against results stored in this JSON file')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed relative slowdown against the baseline')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    screen = init_headless()
+
+    results = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'ticks': args.ticks,
+            'seed': args.seed,
+            'render': args.render,
+        },
+        'scenarios': {},
+    }
+
+    for name in args.only or SCENARIOS:
+        results['scenarios'][name] = run_scenario(name, args.ticks, args.seed,
+                                                  screen if args.render else None,
+                                                  allocations=not args.no_alloc)
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,7 +3,7 @@ from enum import Enum
 
 from pygame import Surface
 
-from config import ATLAS
+from config import ATLAS, CELL_SIZE
 from util import GameObject
 
 
@@ -18,8 +18,8 @@ class BonusType(Enum):
     GUN = (44, 14)
 
     @classmethod
-    def random(cls):
-        return random.choice(list(cls))
+    def random(cls, rng=random):
+        return rng.choice(list(cls))
 
 
 class Bonus(GameObject):
@@ -28,10 +28,16 @@ class Bonus(GameObject):
         self.type = bonus_type
         self.sprite = ATLAS().image_at(*bonus_type.value, 2, 2)
 
-        sz = ATLAS().real_sprite_size
+        sz = CELL_SIZE
         self.position = x - sz, y - sz
 
         self.size = (sz * 2, sz * 2)
 
+    @property
+    def center_point(self):
+        x, y = self.position
+        w, h = self.size
+        return x + w // 2, y + h // 2
+
     def render(self, screen: Surface):
         screen.blit(self.sprite, self.position)
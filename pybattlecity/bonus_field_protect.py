@@ -10,34 +10,35 @@ class FieldProtector:
     def __init__(self, field: Field):
         self.field = field
         self._blink_animator = Animator(delay=1, max_states=2)
-        self._protected_timer = Timer(delay=15)
-        self._blink_timer = Timer(delay=6)
+        self._protected_timer = Timer(delay=15, callback=self._on_protection_over)
+        self._blink_timer = Timer(delay=6, callback=self._on_blinking_over)
+        self._state = self.NOT_PROTECTED
+
+    def _on_protection_over(self):
+        self._state = self.BLINKING
+        self._blink_timer.start()
+
+    def _on_blinking_over(self):
+        self._change_base_border_tye(CellType.BRICK)
         self._state = self.NOT_PROTECTED
 
     def update(self):
-        if self._state == self.PROTECTED:
-            if self._protected_timer.tick():
-                self._state = self.BLINKING
-                self._blink_timer.start()
-        elif self._state == self.BLINKING:
-            if self._blink_timer.tick():
-                self._change_base_border_tye(CellType.BRICK)
-                self._state = self.NOT_PROTECTED
-            else:
-                state = self._blink_animator()
-                self._change_base_border_tye(CellType.BRICK if state else CellType.CONCRETE)
+        if self._state == self.BLINKING:
+            state = self._blink_animator()
+            self._change_base_border_tye(CellType.BRICK if state else CellType.CONCRETE)
 
     @property
     def cells_around_base(self):
+        c, r = self.field.base_location
         return [
-            (11, 25),
-            (11, 24),
-            (11, 23),
-            (12, 23),
-            (13, 23),
-            (14, 23),
-            (14, 24),
-            (14, 25)
+            (c - 1, r + 1),
+            (c - 1, r),
+            (c - 1, r - 1),
+            (c, r - 1),
+            (c + 1, r - 1),
+            (c + 2, r - 1),
+            (c + 2, r),
+            (c + 2, r + 1)
         ]
 
     def _change_base_border_tye(self, ct: CellType):
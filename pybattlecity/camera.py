@@ -0,0 +1,99 @@
+import pygame
+
+
+class Camera:
+    """
+    Shows a part of the world (the field) in a viewport on the screen.
+    Game.render passes the camera to GameObject.visit instead of the screen surface,
+    so render() implementations blit in world coordinates and the camera shifts them.
+
+    blit() only queues the sprite; the queue goes to the screen with one Surface.blits call
+    at end() or when someone draws on the surface directly (the surface property),
+    so the order of drawing (z-order of the scene) is kept.
+
+    With scale > 1 one pixel of the surface is scale x scale world pixels (see config.NATIVE_RENDER):
+    positions and sizes are still given in world coordinates, the sprites are in the pixels of the surface.
+    """
+    CULL_MARGIN = 16  # effects (shield, spawn) stick out of bounding rects a bit
+
+    def __init__(self, viewport, world_rect, scale=1):
+        self.viewport = tuple(viewport)  # x, y, w, h on the screen
+        self.world_rect = tuple(world_rect)
+        self.scale = scale
+        if scale != 1:
+            self.blit = self._blit_scaled
+        self._surface = None  # type: pygame.Surface
+        self._queue = []
+        self._dx = self._dy = 0
+        self._cull_rect = (0, 0, 0, 0)
+        self.position = self.world_rect[:2]
+
+    @property
+    def position(self):
+        """world coordinates of the top-left corner of the viewport"""
+        return self._position
+
+    @position.setter
+    def position(self, p):
+        self._position = x, y = p
+        vx, vy, vw, vh = self.viewport
+        s = self.scale
+        self._dx, self._dy = vx * s - x, vy * s - y
+        m = self.CULL_MARGIN
+        self._cull_rect = (x - m, y - m, vw * s + m * 2, vh * s + m * 2)
+
+    @property
+    def visible_rect(self):
+        _, _, vw, vh = self.viewport
+        return (*self.position, vw * self.scale, vh * self.scale)
+
+    def follow(self, point):
+        px, py = point
+        wx, wy, ww, wh = self.world_rect
+        _, _, vw, vh = self.visible_rect
+        x = min(max(px - vw // 2, wx), wx + ww - vw) if ww > vw else wx
+        y = min(max(py - vh // 2, wy), wy + wh - vh) if wh > vh else wy
+        self.position = x, y
+
+    def sees(self, rect):
+        x, y, w, h = rect
+        cx, cy, cw, ch = self._cull_rect
+        return x < cx + cw and x + w > cx and y < cy + ch and y + h > cy
+
+    def to_screen(self, x, y):
+        s = self.scale
+        return (x + self._dx) // s, (y + self._dy) // s
+
+    def to_screen_rect(self, rect):
+        x, y, w, h = rect
+        s = self.scale
+        return (x + self._dx) // s, (y + self._dy) // s, w // s, h // s
+
+    @property
+    def surface(self) -> pygame.Surface:
+        """the screen surface for drawing in screen coordinates, the queued sprites are drawn first"""
+        self.flush()
+        return self._surface
+
+    def begin(self, surface: pygame.Surface):
+        self._surface = surface
+        surface.set_clip(self.viewport)
+
+    def end(self):
+        self.flush()
+        self._surface.set_clip(None)
+        self._surface = None
+
+    def flush(self):
+        if self._queue:
+            self._surface.blits(self._queue, doreturn=False)
+            self._queue.clear()
+
+    def blit(self, sprite, position):
+        x, y = position
+        self._queue.append((sprite, (x + self._dx, y + self._dy)))
+
+    def _blit_scaled(self, sprite, position):
+        x, y = position
+        s = self.scale
+        self._queue.append((sprite, ((x + self._dx) // s, (y + self._dy) // s)))
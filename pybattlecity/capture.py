@@ -0,0 +1,93 @@
+"""
+Capture of rendered frames to a sequence of PNG files.
+
+The game loop only copies a frame into one of the preallocated buffers,
+a writer thread compresses and saves it. When all the buffers wait for the disk
+the game loop waits for a free one (backpressure), so no frame is lost
+and the memory stays bounded.
+
+    python3 cli.py headless --seed 1 --capture frames/
+    python3 cli.py replay game.json --capture frames/ --capture-every 2
+    ffmpeg -framerate 30 -i frames/frame_%06d.png game.mp4
+"""
+import os
+import queue
+import threading
+import time
+
+import pygame
+
+
+class FrameCapture:
+    FILE_PATTERN = 'frame_{:06d}.png'
+
+    def __init__(self, directory, size, buffers=8, every=1):
+        """
+        :param size: size of the frames (of the rendered surface)
+        :param buffers: frames which may wait for the writer
+        :param every: save every n-th frame
+        """
+        self.directory = directory
+        self.every = every
+        os.makedirs(directory, exist_ok=True)
+
+        self._buffers = [pygame.Surface(size) for _ in range(buffers)]
+        self._free = queue.Queue()
+        for i in range(buffers):
+            self._free.put(i)
+        self._pending = queue.Queue()  # (buffer index, frame number), None to stop
+
+        self.frames = 0  # offered frames
+        self.saved = 0
+        self.blocked_seconds = 0.0  # the game loop waited for a free buffer
+        self.error = None
+
+        self._writer = threading.Thread(target=self._write, name='frame-writer', daemon=True)
+        self._writer.start()
+
+    def capture(self, surface: pygame.Surface):
+        n = self.frames
+        self.frames += 1
+        if n % self.every:
+            return
+        if self.error is not None:
+            raise self.error
+
+        try:
+            i = self._free.get_nowait()
+        except queue.Empty:
+            t0 = time.perf_counter()
+            i = self._free.get()
+            self.blocked_seconds += time.perf_counter() - t0
+
+        self._buffers[i].blit(surface, (0, 0))
+        self._pending.put((i, n // self.every))
+
+    def _write(self):
+        while True:
+            job = self._pending.get()
+            if job is None:
+                break
+            i, n = job
+            try:
+                if self.error is None:
+                    pygame.image.save(self._buffers[i], os.path.join(self.directory, self.FILE_PATTERN.format(n)))
+                    self.saved += 1
+            except Exception as e:
+                self.error = e  # raised on the game loop thread by the next capture()
+            finally:
+                self._free.put(i)
+
+    def close(self):
+        """wait until every captured frame is saved"""
+        if self._writer.is_alive():
+            self._pending.put(None)
+            self._writer.join()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,303 @@
+"""
+Command line entry point.
+
+    python3 cli.py play [--level level2] [--seed 1] [--record game.json]
+    python3 cli.py headless --level level1 --seed 1 [--text]
+    python3 cli.py bench --ticks 300
+    python3 cli.py stress --max-enemies 600
+    python3 cli.py memory --scenario tanks_200
+    python3 cli.py replay game.json [--capture frames/]
+    python3 cli.py replay-check --seeds 12
+    python3 cli.py tournament --seeds 20 --workers 4
+    python3 cli.py compare --seeds 1000
+    python3 cli.py server --port 7001
+    python3 cli.py levels
+
+Every command imports only the modules it needs, so the tools which don't draw
+don't pay for pygame and the sprite atlas.
+"""
+import argparse
+import sys
+
+import config
+
+
+def configure(args):
+    # before the game modules are imported: they copy these with "from config import *"
+    config.DEBUG = args.debug
+    config.FIELD_DEBUG = args.field_debug
+    config.PROJECTILE_DEBUG = args.projectile_debug
+    config.NATIVE_RENDER = args.native_render
+
+
+def cmd_play(args):
+    from main import play
+    play(args.level, args.seed, args.record, args.frame_gc, args.gc_stats, args.autopilot, args.time_scale,
+         args.render_every_tick)
+    return 0
+
+
+def time_scale(value):
+    """argparse type: a number or max"""
+    if value == 'max':
+        return None
+    from util import TickPacer
+    scale = float(value)
+    try:
+        TickPacer(1, scale)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return scale
+
+
+def print_match(r):
+    outcome = ('WIN' if r.victory else 'LOSE') if r.finished else 'TIMEOUT'
+    print(f'{r.level} seed={r.seed}: {outcome} score={r.score} ticks={r.ticks} ({r.seconds} s)')
+
+
+def make_capture(args, screen):
+    if not args.capture:
+        return None
+    from capture import FrameCapture
+    return FrameCapture(args.capture, screen.get_size(), args.capture_buffers, args.capture_every)
+
+
+def close_capture(capture):
+    if capture is not None:
+        capture.close()
+        print(f'{capture.saved} frames saved to {capture.directory}, '
+              f'the game waited for the writer {capture.blocked_seconds:.3f} s')
+
+
+def watch_in_terminal(args, match):
+    """
+    :param match: keyword arguments of run_match -> MatchResult
+    :return: run the match, shown in the terminal if args.text
+    """
+    if not args.text:
+        return match()
+    import curses
+    from textview import TextView
+    return curses.wrapper(lambda window: match(view=TextView(window, args.fps), speed=args.speed))
+
+
+def cmd_headless(args):
+    from headless import init_headless, run_match
+    screen = init_headless()
+    capture = make_capture(args, screen)
+    result = watch_in_terminal(args, lambda **kwargs: run_match(
+        args.level, args.seed, args.ticks, screen=screen if args.render or capture else None,
+        capture=capture, enemy_ai=args.enemy_ai, autopilot=args.autopilot, tick_scale=args.tick_scale,
+        **kwargs))
+    close_capture(capture)
+    print_match(result)
+    return 0
+
+
+def cmd_bench(args):
+    import bench
+    return bench.main(args.tool_args)
+
+
+def cmd_stress(args):
+    import stress
+    return stress.main(args.tool_args)
+
+
+def cmd_memory(args):
+    import memstats
+    return memstats.main(args.tool_args)
+
+
+def cmd_compare(args):
+    import compare_ai
+    return compare_ai.main(args.tool_args)
+
+
+def cmd_server(args):
+    import server
+    return server.main(args.tool_args)
+
+
+def cmd_replay(args):
+    from headless import init_headless, run_match
+    from replay import Recording
+    recording = Recording.load(args.file)
+    screen = init_headless()
+    capture = make_capture(args, screen)
+    result = watch_in_terminal(args, lambda **kwargs: run_match(
+        recording.level, recording.seed, args.ticks, inputs=recording.inputs(),
+        screen=screen if args.render or capture else None, fixed_step=recording.fixed_step,
+        capture=capture, **kwargs))
+    close_capture(capture)
+    print_match(result)
+
+    expected = recording.result
+    if expected is not None:
+        got = {'victory': result.victory, 'score': result.score, 'ticks': result.ticks}
+        if got != expected:
+            print(f'Replay diverged: recorded {expected}, replayed {got}')
+            return 1
+    return 0
+
+
+def cmd_replay_check(args):
+    from headless import init_headless, check_replay
+    init_headless()
+    diverged = 0
+    for seed in range(args.seed, args.seed + args.seeds):
+        recorded, replayed = check_replay(args.level, seed, args.ticks)
+        if recorded != replayed:
+            diverged += 1
+            print(f'{args.level} seed={seed}: replay diverged: recorded {recorded}, replayed {replayed}')
+        else:
+            print(f'{args.level} seed={seed}: ok {recorded}')
+    return 1 if diverged else 0
+
+
+def _tournament_match(job):
+    from headless import run_match
+    level, seed, max_ticks, autopilot = job
+    return run_match(level, seed, max_ticks, autopilot=autopilot)
+
+
+def cmd_tournament(args):
+    from concurrent.futures import ProcessPoolExecutor
+    from headless import init_headless
+    from levels import get_level_pack
+
+    levels = args.levels or get_level_pack().names
+    jobs = [(level, seed, args.ticks, args.autopilot) for level in levels
+            for seed in range(args.seed, args.seed + args.seeds)]
+
+    with ProcessPoolExecutor(args.workers, initializer=init_headless) as executor:
+        results = list(executor.map(_tournament_match, jobs))
+
+    for r in results:
+        print_match(r)
+
+    print(f'{"level":<12}{"matches":>9}{"wins":>6}{"losses":>8}{"timeouts":>10}{"avg score":>11}{"avg ticks":>11}')
+    for level in levels:
+        rs = [r for r in results if r.level == level]
+        wins = sum(r.finished and r.victory for r in rs)
+        losses = sum(r.finished and not r.victory for r in rs)
+        print(f'{level:<12}{len(rs):>9}{wins:>6}{losses:>8}{len(rs) - wins - losses:>10}'
+              f'{sum(r.score for r in rs) / len(rs):>11.1f}{sum(r.ticks for r in rs) / len(rs):>11.1f}')
+    return 0
+
+
+def cmd_levels(args):
+    from levels import get_level_pack
+    pack = get_level_pack()
+    for level in pack.load_all():
+        print(f'{level.name:<12}{level.width:>4} x {level.height:<4}{level.digest.hex()[:12]}')
+    return 0
+
+
+def parse_args(argv):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--debug', action='store_true')
+    common.add_argument('--field-debug', action='store_true')
+    common.add_argument('--projectile-debug', action='store_true')
+    common.add_argument('--native-render', action='store_true',
+                        help='draw the field at the resolution of the sprites and scale it up once')
+
+    capture = argparse.ArgumentParser(add_help=False)
+    capture.add_argument('--capture', metavar='DIR', help='save the rendered frames as PNG files to DIR')
+    capture.add_argument('--capture-every', type=int, default=1, metavar='N', help='save every n-th frame')
+    capture.add_argument('--capture-buffers', type=int, default=8, metavar='N',
+                         help='frames which may wait for the disk before the game waits')
+
+    text = argparse.ArgumentParser(add_help=False)
+    text.add_argument('--text', action='store_true', help='show the game in the terminal (see textview.py)')
+    text.add_argument('--fps', type=int, default=10, help='redraws of the terminal per second at most')
+    text.add_argument('--speed', type=float, default=1.0,
+                      help='with --text: times faster than the real time, 0 for as fast as possible')
+
+    parser = argparse.ArgumentParser(description='Battle City in Python')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('play', parents=[common], help='play in a window')
+    p.add_argument('--level', help='level name, the first one by default')
+    p.add_argument('--seed', type=int)
+    p.add_argument('--record', metavar='FILE', help='save the input of the first game for a replay')
+    p.add_argument('--frame-gc', action='store_true', help='run the garbage collector only between frames')
+    p.add_argument('--gc-stats', action='store_true', help='print the garbage collector pauses at exit')
+    p.add_argument('--autopilot', action='store_true', help='start with the autopilot on (P switches it)')
+    p.add_argument('--time-scale', type=time_scale, default=1.0, metavar='X',
+                   help='game time per real time, 0.25 to 16 or max ([ and ] change it)')
+    p.add_argument('--render-every-tick', action='store_true',
+                   help='draw every tick, not only the last one before a frame is shown')
+    p.set_defaults(run=cmd_play)
+
+    p = commands.add_parser('headless', parents=[common, capture, text], help='play one seeded game without a window')
+    p.add_argument('--level', default='level1')
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--ticks', type=int, default=config.MAX_MATCH_TICKS, help='stop after this many ticks')
+    p.add_argument('--render', action='store_true', help='render every tick to an off-screen surface')
+    p.add_argument('--enemy-ai', default='walker', help='enemy AI variant: walker or hunter (see ai.TANK_AIS)')
+    p.add_argument('--autopilot', action='store_true', help='the player tank drives itself (see autopilot.py)')
+    p.add_argument('--tick-scale', type=int, default=1, help='simulate this many fixed steps per tick')
+    p.set_defaults(run=cmd_headless)
+
+    p = commands.add_parser('bench', parents=[common], help='benchmark of the simulation, takes the arguments of bench.py')
+    p.set_defaults(run=cmd_bench)
+
+    p = commands.add_parser('stress', parents=[common], help='hundreds of enemies, takes the arguments of stress.py')
+    p.set_defaults(run=cmd_stress)
+
+    p = commands.add_parser('memory', parents=[common],
+                            help='allocations per tick and GC pauses, takes the arguments of memstats.py')
+    p.set_defaults(run=cmd_memory)
+
+    p = commands.add_parser('replay', parents=[common, capture, text], help='play a recorded game without a window')
+    p.add_argument('file')
+    p.add_argument('--ticks', type=int, default=config.MAX_MATCH_TICKS)
+    p.add_argument('--render', action='store_true')
+    p.set_defaults(run=cmd_replay)
+
+    p = commands.add_parser('replay-check', parents=[common],
+                            help='record autopilot games and replay them, exit 1 if a replay diverges')
+    p.add_argument('--level', default='level1')
+    p.add_argument('--seeds', type=int, default=12, help='games to record')
+    p.add_argument('--seed', type=int, default=0, help='first seed')
+    p.add_argument('--ticks', type=int, default=config.MAX_MATCH_TICKS)
+    p.set_defaults(run=cmd_replay_check)
+
+    p = commands.add_parser('tournament', parents=[common], help='many seeded headless games in parallel')
+    p.add_argument('--levels', nargs='+', help='all levels of the pack by default')
+    p.add_argument('--seeds', type=int, default=10, help='games per level')
+    p.add_argument('--seed', type=int, default=0, help='first seed')
+    p.add_argument('--workers', type=int, help='processes, one per CPU by default')
+    p.add_argument('--ticks', type=int, default=config.MAX_MATCH_TICKS)
+    p.add_argument('--autopilot', action='store_true', help='the player tanks drive themselves')
+    p.set_defaults(run=cmd_tournament)
+
+    p = commands.add_parser('compare', parents=[common],
+                            help='compare the enemy AI variants, takes the arguments of compare_ai.py')
+    p.set_defaults(run=cmd_compare)
+
+    p = commands.add_parser('server', parents=[common],
+                            help='many rooms in one process over TCP, takes the arguments of server.py')
+    p.set_defaults(run=cmd_server)
+
+    p = commands.add_parser('levels', parents=[common], help='compile and list the level pack')
+    p.set_defaults(run=cmd_levels)
+
+    # bench.py, stress.py, memstats.py, compare_ai.py and server.py parse their own arguments
+    args, rest = parser.parse_known_args(argv)
+    if args.command in ('bench', 'stress', 'memory', 'compare', 'server'):
+        args.tool_args = rest
+    elif rest:
+        parser.error(f'unrecognized arguments: {" ".join(rest)}')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure(args)
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Comparison of the enemy AI variants (ai.TANK_AIS) on seeded headless matches.
+
+Every variant plays the same levels and seeds against an idle player (or the autopilot),
+the matches run in parallel processes. For each variant:
+    base kills - matches where the enemies destroyed the base (win rate of the AI)
+    time to kill - game seconds until the base was destroyed, over those matches
+    decision - CPU time of one TankAI.decide call, the mean of the matches
+with 95% confidence intervals.
+
+    python3 compare_ai.py --seeds 1000
+    python3 compare_ai.py --seeds 1000 --autopilot
+    python3 compare_ai.py --variants walker hunter --levels level1 level2 --workers 4 --output ai.json
+"""
+import argparse
+import json
+import math
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import MAX_MATCH_TICKS, TICK_TIME
+
+
+Z_95 = 1.96
+
+
+def _match(job):
+    from headless import run_match
+    variant, level, seed, max_ticks, autopilot = job
+    return run_match(level, seed, max_ticks, enemy_ai=variant, autopilot=autopilot)
+
+
+def wilson_interval(successes, n, z=Z_95):
+    """:return: (low, high) of a proportion"""
+    if n == 0:
+        return 0.0, 0.0
+    p = successes / n
+    d = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / d
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / d
+    return center - half, center + half
+
+
+def mean_interval(values, z=Z_95):
+    """:return: (mean, half width of the interval), normal approximation"""
+    if not values:
+        return 0.0, 0.0
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return mean, 0.0
+    return mean, z * statistics.stdev(values) / math.sqrt(len(values))
+
+
+def summarize(results, fixed_step=TICK_TIME):
+    """:param results: MatchResult of one variant"""
+    kills = [r for r in results if r.finished and not r.victory]
+    low, high = wilson_interval(len(kills), len(results))
+    kill_s, kill_ci = mean_interval([r.ticks * fixed_step for r in kills])
+    decision_us, decision_ci = mean_interval([r.decision_ns / r.decisions / 1000 for r in results if r.decisions])
+    return {
+        'matches': len(results),
+        'base_kills': len(kills),
+        'player_wins': sum(r.finished and r.victory for r in results),
+        'kill_rate': round(len(kills) / len(results), 4) if results else 0.0,
+        'kill_rate_ci': [round(low, 4), round(high, 4)],
+        'time_to_kill_s': round(kill_s, 2),
+        'time_to_kill_ci_s': round(kill_ci, 2),
+        'decision_us': round(decision_us, 2),
+        'decision_ci_us': round(decision_ci, 2),
+        'decisions_per_match': round(sum(r.decisions for r in results) / len(results), 1) if results else 0.0,
+    }
+
+
+def run(variants, levels, seeds, first_seed=0, max_ticks=MAX_MATCH_TICKS, workers=None, autopilot=False):
+    """:return: variant -> [MatchResult]"""
+    from headless import init_headless
+    jobs = [(variant, level, seed, max_ticks, autopilot) for variant in variants for level in levels
+            for seed in range(first_seed, first_seed + seeds)]
+    with ProcessPoolExecutor(workers, initializer=init_headless) as executor:
+        results = list(executor.map(_match, jobs, chunksize=max(1, len(jobs) // (8 * (workers or 4)))))
+    return {variant: [r for r in results if r.enemy_ai == variant] for variant in variants}
+
+
+def parse_args(argv):
+    from ai import TANK_AIS
+    parser = argparse.ArgumentParser(description='Compare the enemy AI variants on seeded headless matches')
+    parser.add_argument('--variants', nargs='+', default=sorted(TANK_AIS), choices=sorted(TANK_AIS))
+    parser.add_argument('--levels', nargs='+', default=['level1'])
+    parser.add_argument('--seeds', type=int, default=200, help='matches per variant and level')
+    parser.add_argument('--seed', type=int, default=0, help='first seed')
+    parser.add_argument('--ticks', type=int, default=MAX_MATCH_TICKS, help='a match is stopped after this many ticks')
+    parser.add_argument('--workers', type=int, help='processes, one per CPU by default')
+    parser.add_argument('--autopilot', action='store_true', help='the player defends (see autopilot.py)')
+    parser.add_argument('--output', help='write the summary to this JSON file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    t0 = time.perf_counter()
+    by_variant = run(args.variants, args.levels, args.seeds, args.seed, args.ticks, args.workers,
+                     args.autopilot)
+    seconds = time.perf_counter() - t0
+
+    summary = {variant: summarize(results) for variant, results in by_variant.items()}
+    print(f'{sum(map(len, by_variant.values()))} matches in {seconds:.1f} s, 95% confidence intervals')
+    print(f'{"variant":<10}{"matches":>8}{"base kills":>22}{"time to kill, s":>20}{"decision, us":>18}{"decisions":>11}')
+    for variant, s in summary.items():
+        low, high = s['kill_rate_ci']
+        print(f'{variant:<10}{s["matches"]:>8}'
+              f'{s["kill_rate"] * 100:>8.1f}% [{low * 100:4.1f}-{high * 100:4.1f}%]'
+              f'{s["time_to_kill_s"]:>12.1f} ±{s["time_to_kill_ci_s"]:<6.1f}'
+              f'{s["decision_us"]:>10.1f} ±{s["decision_ci_us"]:<6.1f}{s["decisions_per_match"]:>11.0f}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'variants': summary}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,23 +1,49 @@
-from spritesheet import SpriteSheet
-import sys
+# debug switches, set by cli.py before the game modules are imported
+# (they take the values with "from config import *")
+FIELD_DEBUG = False
+DEBUG = False
+PROJECTILE_DEBUG = False
 
-FIELD_DEBUG = '--field-debug' in sys.argv
-DEBUG = '--debug' in sys.argv
-PROJECTILE_DEBUG = '--projectile-debug' in sys.argv
+# draw the field at the resolution of the atlas (8 px per cell) and scale it to the window once
+NATIVE_RENDER = False
 
 GAME_WIDTH = 540
 GAME_HEIGHT = 480
+SCREEN_COLOR = (0, 0, 139)  # around the field
 
 FIELD_HEIGHT = FIELD_WIDTH = 13 * 2  # 13 full blocks by (2x2) cells each
 
+# size of a cell in the game coordinates, it does not depend on how the game is drawn
+CELL_SIZE = 16
+
+# game time per update when the game runs with a fixed step (headless, benchmarks)
+TICK_TIME = 1 / 60
+
+# a window shows this many frames per second at most, the ticks are paced by the time scale (util.TickPacer)
+FRAME_RATE = 60
+
+# headless matches are stopped after this many ticks (5 minutes of game time)
+MAX_MATCH_TICKS = 60 * 60 * 5
+
+# the part of the screen where the field is shown (26 x 26 cells of 16 px)
+VIEWPORT = (40, 40, 416, 416)
+
 ATLAS_FILE = 'data/atlas.png'
+SPRITE_SIZE = 8  # pixels per cell in the atlas
 
 _altas = None
 
-def get_atlas() -> SpriteSheet:
+def get_atlas() -> 'SpriteSheet':
     global _altas
     if _altas is None:
-        _altas = SpriteSheet(ATLAS_FILE, upsample=2, sprite_size=8)
+        from spritesheet import SpriteSheet  # pygame is needed only by those who draw
+        upsample = 1 if NATIVE_RENDER else CELL_SIZE // SPRITE_SIZE
+        _altas = SpriteSheet(ATLAS_FILE, upsample=upsample, sprite_size=SPRITE_SIZE)
     return _altas
 
 ATLAS = get_atlas
+
+
+def get_render_scale():
+    """game coordinates per pixel of the sprites: 1, or 2 when NATIVE_RENDER is on"""
+    return CELL_SIZE // get_atlas().real_sprite_size
@@ -30,6 +30,11 @@ class DiscreteMap:
         row = floor((y - ys) / self.step)
         return col, row
 
+    @property
+    def columns(self):
+        """raw cells: columns[col][row]"""
+        return self._cells
+
     def inside_col_row(self, col, row):
         return 0 <= col < self.width and 0 <= row < self.height
 
@@ -40,6 +45,10 @@ class DiscreteMap:
         else:
             return None
 
+    def load_columns(self, columns):
+        assert len(columns) == self.width and all(len(c) == self.height for c in columns), "size mismatch"
+        self._cells = columns
+
     def get_cell_by_coords(self, x, y):
         return self.get_cell_by_col_row(*self.col_row_from_coords(x, y))
 
@@ -58,10 +67,34 @@ class DiscreteMap:
                 if occupied is not None:
                     x, y = self.coord_by_col_and_row(col, row)
                     color = DEMO_COLORS[id(occupied) % len(DEMO_COLORS)]
-                    pygame.draw.rect(screen, color, (x, y, step, step))
+                    pygame.draw.rect(screen.surface, color, screen.to_screen_rect((x, y, step, step)))
 
 
 class OccupancyMap(DiscreteMap):
+    """
+    Filled again on every tick: clear() resets only the cells filled by fill_rect since the last one.
+    """
+    def clear(self):
+        filled = getattr(self, '_filled', None)
+        if filled is None:
+            super().clear()
+        else:
+            dv, cells = self.default_value, self._cells
+            for cols, rows in filled:
+                for col in cols:
+                    column = cells[col]
+                    for row in rows:
+                        column[row] = dv
+        self._filled = []
+
+    def load_columns(self, columns):
+        super().load_columns(columns)
+        self._filled = None
+
+    def set_cell_col_row(self, col, row, cell):
+        super().set_cell_col_row(col, row, cell)
+        self._filled = None  # not tracked: the next clear() is a full one
+
     def find_col_row_of_rect(self, r):
         x, y, w, h = r
         assert w >= 0 and h >= 0
@@ -77,14 +110,44 @@ class OccupancyMap(DiscreteMap):
             for row in range(min_r, max_r + 1):
                 yield col, row
 
+    def _inner_ranges(self, rect):
+        """:return: columns and rows of find_col_row_of_rect inside the map, does it reach outside"""
+        x, y, w, h = rect
+        assert w >= 0 and h >= 0
+
+        # the same ranges as find_col_row_of_rect: a rect beyond an edge still takes the edge cells
+        width, height = self.width, self.height
+        c1, r1 = self.col_row_from_coords(x, y)
+        c2, r2 = self.col_row_from_coords(x + w, y + h)
+        min_c, max_c = min(c1, c2, width - 1), max(c1, c2, 0)
+        min_r, max_r = min(r1, r2, height - 1), max(r1, r2, 0)
+        outside = min_c < 0 or max_c >= width or min_r < 0 or max_r >= height
+        return (range(max(min_c, 0), min(max_c, width - 1) + 1),
+                range(max(min_r, 0), min(max_r, height - 1) + 1), outside)
+
+    # these run for every tank and projectile on every tick: the cells are indexed directly
     def fill_rect(self, rect, v=1, only_if_empty=False):
-        for col, row in self.find_col_row_of_rect(rect):
-            if not only_if_empty or self.get_cell_by_col_row(col, row) is None:
-                self.set_cell_col_row(col, row, v)
+        cols, rows, _ = self._inner_ranges(rect)
+        if self._filled is not None:
+            self._filled.append((cols, rows))
+        cells = self._cells
+        for col in cols:
+            column = cells[col]
+            for row in rows:
+                if not only_if_empty or column[row] is None:
+                    column[row] = v
 
     def test_rect(self, rect, good_values=(0, 1)):
-        cells_to_test = self.find_col_row_of_rect(rect)
-        return self.test_cells(cells_to_test, good_values)
+        cols, rows, outside = self._inner_ranges(rect)
+        if outside and None not in good_values:
+            return False  # get_cell_by_col_row gives None there
+        cells = self._cells
+        for col in cols:
+            column = cells[col]
+            for row in rows:
+                if column[row] not in good_values:
+                    return False
+        return True
 
     def test_cells(self, cols_rows, good_values=(0,)):
         return all(self.get_cell_by_col_row(c, r) in good_values for c, r in cols_rows)
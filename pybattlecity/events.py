@@ -0,0 +1,80 @@
+"""
+Game events.
+
+The game only appends event records to a per-tick buffer (bus.emit is the bound
+list.append, no extra Python call in the hot loops). After each Game.update the
+buffer is handed to the subscribers in one batch.
+"""
+import datetime
+from collections import namedtuple
+
+
+# killer: tank which fired the projectile, None if the tank was killed by a bonus
+TankDestroyed = namedtuple('TankDestroyed', ('tank', 'killer', 'x', 'y'))
+BrickDestroyed = namedtuple('BrickDestroyed', ('col', 'row', 'old_cell', 'new_cell'))
+BonusPicked = namedtuple('BonusPicked', ('tank', 'bonus_type', 'x', 'y'))
+BaseHit = namedtuple('BaseHit', ('projectile', 'x', 'y'))
+ProjectileFired = namedtuple('ProjectileFired', ('projectile', 'tank'))
+GameFinished = namedtuple('GameFinished', ('victory', 'score'))
+
+ALL_EVENTS = (TankDestroyed, BrickDestroyed, BonusPicked, BaseHit, ProjectileFired, GameFinished)
+
+
+class EventBus:
+    def __init__(self):
+        self._buffer = []
+        self.emit = self._buffer.append
+        self._subscribers = []  # [(callback, event types or None)]
+
+    def subscribe(self, callback, *event_types):
+        """
+        :param callback: called with the list of events of the tick
+        :param event_types: only pass events of these types; all events if empty
+        """
+        self._subscribers.append((callback, frozenset(event_types) or None))
+        return callback
+
+    def unsubscribe(self, callback):
+        self._subscribers = [s for s in self._subscribers if s[0] != callback]
+
+    @property
+    def pending(self):
+        return len(self._buffer)
+
+    def flush(self):
+        if not self._buffer:
+            return
+        # the buffer keeps its identity: emit is bound to it
+        batch = self._buffer[:]
+        self._buffer.clear()
+        for callback, event_types in self._subscribers:
+            if event_types is None:
+                callback(batch)
+            else:
+                events = [e for e in batch if type(e) in event_types]
+                if events:
+                    callback(events)
+
+
+class ResultLogger:
+    """appends the outcome of every finished game to a text file"""
+    def __init__(self, filename='results.log'):
+        self.filename = filename
+
+    def __call__(self, events):
+        for e in events:
+            if type(e) is GameFinished:
+                label = 'WIN' if e.victory else 'LOSE'
+                try:
+                    with open(self.filename, 'a') as f:
+                        f.write(f"{datetime.datetime.now().isoformat()} {label} score={e.score}\n")
+                except OSError as err:
+                    print(f"Failed to write {self.filename}:", err)
+
+
+def print_events(events):
+    for e in events:
+        if type(e) is GameFinished:
+            print('WIN' if e.victory else 'GAME OVER', '- score:', e.score)
+        elif type(e) is BonusPicked:
+            print(f'Bonus {e.bonus_type.name} picked')
@@ -21,27 +21,30 @@ class Explosion(GameObject):
         TYPE_SUPER_SHORT: 2
     }
 
+    FRAME_TIME = 0.08
+
+    _sprites = None  # shared by all the explosions, a chain of them makes no new surfaces
+
     def __init__(self, x, y, type=TYPE_FULL):
         super().__init__()
 
         self.position = x, y
-        n = self._n_states[type]
-        self.animator = Animator(0.08, n, once=True)
-        self.sprites = [ATLAS().image_at(x, y, sx, sy) for
-                        x, y, sx, sy in self.SPRITE_DESCRIPTORS]
+        self.n_states = self._n_states[type]
+        # the scheduler removes it when it is over, drawn or not
+        self.timer = ArmedTimer(self.FRAME_TIME * self.n_states, callback=self.remove_from_parent)
+        if Explosion._sprites is None:
+            Explosion._sprites = [ATLAS().image_at(x, y, sx, sy) for
+                                  x, y, sx, sy in self.SPRITE_DESCRIPTORS]
 
     def render(self, screen):
-        state = self.animator()
-
-        if self.animator.done:
-            self.remove_from_parent()
-        else:
-            _, _, w, h = self.SPRITE_DESCRIPTORS[state]
-            half_sprite_size = ATLAS().real_sprite_size // 2
-            w_pix = w * half_sprite_size
-            h_pix = h * half_sprite_size
-            x, y = self.position
-            x -= w_pix
-            y -= h_pix
-            sprite = self.sprites[state]
-            screen.blit(sprite, (x, y))
+        timer = self.timer
+        state = min(int((timer.clock.now - timer.last_time) / self.FRAME_TIME), self.n_states - 1)
+        _, _, w, h = self.SPRITE_DESCRIPTORS[state]
+        half_sprite_size = CELL_SIZE // 2
+        w_pix = w * half_sprite_size
+        h_pix = h * half_sprite_size
+        x, y = self.position
+        x -= w_pix
+        y -= h_pix
+        sprite = self._sprites[state]
+        screen.blit(sprite, (x, y))
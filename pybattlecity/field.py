@@ -1,99 +1,111 @@
-from util import GameObject, Direction, rect_intersection, point_in_rect_eq
+from util import GameObject, Direction, point_in_rect_eq
 from config import *
-from enum import Enum, auto
 import pygame
+from terrain import CellType, BLOCKING_MASKS, SOLID_CELLS
+from levels import Level
 from projectile import Projectile
 from discrete_map import DiscreteMap, OccupancyMap
-
-
-class CellType(Enum):
-    FREE = auto()
-    BRICK = auto()
-    BRICK_RIGHT = auto()
-    BRICK_BOTTOM = auto()
-    BRICK_LEFT = auto()
-    BRICK_TOP = auto()
-    CONCRETE = auto()
-    GREEN = auto()
-    SKATE = auto()
-
-    @property
-    def sprite_location(self):
-        return {
-            self.FREE: (32, 13),
-            self.BRICK: (32, 0),
-            self.BRICK_RIGHT: (33, 8),
-            self.BRICK_BOTTOM: (34, 8),
-            self.BRICK_LEFT: (35, 8),
-            self.BRICK_TOP: (36, 8),
-            self.CONCRETE: (32, 2),
-            self.GREEN: (34, 4),
-            self.SKATE: (36, 4)
-        }[self]
-
-    @property
-    def is_draw_over(self):
-        return self == self.GREEN
-
-    @property
-    def can_tank_run_here(self):
-        return self in (
-            self.FREE,
-            self.SKATE,
-            self.GREEN
-        )
-
-    @property
-    def solid(self):
-        return self in (
-            self.BRICK,
-            self.BRICK_TOP,
-            self.BRICK_LEFT,
-            self.BRICK_BOTTOM,
-            self.BRICK_RIGHT,
-            self.CONCRETE
-        )
-
-    @property
-    def brick(self):
-        return self in (
-            self.BRICK,
-            self.BRICK_TOP,
-            self.BRICK_BOTTOM,
-            self.BRICK_LEFT,
-            self.BRICK_RIGHT
-        )
+from events import BrickDestroyed
+
+
+_HALF_BRICK_BY_DIRECTION = {
+    Direction.LEFT: CellType.BRICK_LEFT,
+    Direction.RIGHT: CellType.BRICK_RIGHT,
+    Direction.UP: CellType.BRICK_TOP,
+    Direction.DOWN: CellType.BRICK_BOTTOM
+}
+
+
+def build_hit_tables(step):
+    """
+    What happens when a projectile point hits a cell:
+    tables[direction][power][cell][x_class * 3 + y_class] is None if the point misses the solid
+    part of the cell, otherwise it is the new cell type (the same one if nothing breaks).
+    The class of the point offset inside the cell is 0 - before the middle, 1 - exactly at the middle,
+    2 - after the middle (the borders of cell rects are inclusive).
+    """
+    half = step // 2
+    class_offsets = (0, half, step - 1)
+
+    def outcome(cell, direction, powerful, ox, oy):
+        if not point_in_rect_eq(ox, oy, cell.calculate_rect(0, 0, step)):
+            return None
+        if cell == cell.BRICK:
+            return cell.FREE if powerful else _HALF_BRICK_BY_DIRECTION[direction]
+        elif cell.is_half_brick:
+            return cell.FREE
+        elif cell == cell.CONCRETE and powerful:
+            return cell.FREE
+        return cell
+
+    return {
+        direction: {
+            power: {
+                cell: tuple(outcome(cell, direction, power == Projectile.POWER_HIGH, ox, oy)
+                            for ox in class_offsets for oy in class_offsets)
+                for cell in CellType
+            } for power in (Projectile.POWER_NORMAL, Projectile.POWER_HIGH)
+        } for direction in Direction
+    }
+
+
+class TerrainMap(DiscreteMap):
+    """
+    Map of CellType which remembers what chunks of cells were changed (to redraw them)
+    and keeps a bit mask of the half-cells blocked for tanks (see BLOCKING_MASKS):
+    blocking_rows[half-row] has bit N set if the half-column N is blocked.
+    """
+    CHUNK_SIZE = 8  # in cells
+
+    def __init__(self, *args, **kwargs):
+        self.dirty_chunks = set()
+        self.blocking_rows = []
+        self.version = 0  # grows on every change of the cells
+        super().__init__(*args, **kwargs)
 
     @property
-    def is_half_brick(self):
-        return self.brick and self != self.BRICK
-
-    @classmethod
-    def from_symbol(cls, s):
-        return {
-            '_': cls.FREE,
-            'B': cls.BRICK,
-            'C': cls.CONCRETE,
-            'S': cls.SKATE,
-            'G': cls.GREEN,
-            'l': cls.BRICK_LEFT,
-            't': cls.BRICK_TOP,
-            'b': cls.BRICK_BOTTOM,
-            'r': cls.BRICK_RIGHT
-        }[s]
-
-    def calculate_rect(self, x, y, step):
-        half = step // 2
-        if self == self.BRICK_RIGHT:
-            return x + half, y, half, step
-        elif self == self.BRICK_LEFT:
-            return x, y, half, step
-        elif self == self.BRICK_BOTTOM:
-            return x, y + half, step, half
-        elif self == self.BRICK_TOP:
-            return x, y, step, half
-        else:
-            return x, y, step, step
+    def chunks_size(self):
+        k = self.CHUNK_SIZE
+        return (self.width + k - 1) // k, (self.height + k - 1) // k
+
+    def mark_all_dirty(self):
+        cw, ch = self.chunks_size
+        self.dirty_chunks.update((cx, cy) for cx in range(cw) for cy in range(ch))
+        self._build_blocking_rows()
+        self.version += 1
+
+    def _build_blocking_rows(self):
+        rows = [0] * (self.height * 2)
+        for col, column in enumerate(self._cells):
+            shift = col * 2
+            for row, cell in enumerate(column):
+                top, bottom = BLOCKING_MASKS[cell]
+                rows[row * 2] |= top << shift
+                rows[row * 2 + 1] |= bottom << shift
+        self.blocking_rows = rows
+
+    def _update_blocking_rows(self, col, row, cell):
+        shift = col * 2
+        keep = ~(0b11 << shift)
+        top, bottom = BLOCKING_MASKS[cell]
+        rows = self.blocking_rows
+        rows[row * 2] = rows[row * 2] & keep | top << shift
+        rows[row * 2 + 1] = rows[row * 2 + 1] & keep | bottom << shift
+
+    def clear(self):
+        super().clear()
+        self.mark_all_dirty()
+
+    def load_columns(self, columns):
+        super().load_columns(columns)
+        self.mark_all_dirty()
+
+    def set_cell_col_row(self, col, row, cell):
+        if self.inside_col_row(col, row) and self._cells[col][row] is not cell:
+            self._cells[col][row] = cell
+            self.dirty_chunks.add((col // self.CHUNK_SIZE, row // self.CHUNK_SIZE))
+            self._update_blocking_rows(col, row, cell)
+            self.version += 1
 
 
 class Field(GameObject):
@@ -111,9 +123,10 @@ class Field(GameObject):
         self.width = cells_width
         self.height = cells_height
 
-        self._step = ATLAS().real_sprite_size
+        self._step = CELL_SIZE
 
-        self.map = DiscreteMap(self.position, self._step, cells_width, cells_height)
+        self.map = TerrainMap(self.position, self._step, cells_width, cells_height,
+                              default_value=CellType.FREE)
         self.oc_map = OccupancyMap(self.position, self._step // 2, cells_width * 2, cells_height * 2)
 
         self.position = (40, 40)
@@ -123,72 +136,105 @@ class Field(GameObject):
             t: ATLAS().image_at(*t.sprite_location, 1, 1, colorkey=None) for t in CellType
         }
 
-    def load_from_file(self, filename):
-        with open(filename, 'r') as f:
-            lines = f.readlines()
-        assert len(lines) >= self.height, "incomplete level"
-        for _, (y, line) in zip(range(self.height), enumerate(lines)):
-            assert len(line) >= self.width, "incomplete line"
-            for _, (x, symbol) in zip(range(self.width), enumerate(line)):
-                self.map.set_cell_col_row(x, y, CellType.from_symbol(symbol))
-                if FIELD_DEBUG:
-                    print(symbol, end='')
-            if FIELD_DEBUG:
-                print()  # new line
+        self._chunks = {}  # pre-rendered terrain: (chunk col, chunk row) -> Surface
+
+        self.events = None  # EventBus of the game, gets BrickDestroyed
 
+        self._hit_tables = build_hit_tables(self._step)
+        aim_distance = int(self._step / 1.4)
+        self._aim_offsets = {d: (d.vector[1] * aim_distance, -d.vector[0] * aim_distance) for d in Direction}
+
+    def load_level(self, level: Level):
+        assert (level.width, level.height) == (self.width, self.height), "level size mismatch"
+        self.map.load_columns(level.copy_columns())
+        if FIELD_DEBUG:
+            print(level)
+
+    def load_from_file(self, filename):
+        self.load_level(Level.from_file(filename))
 
     @property
     def rect(self):
         return [*self.position, self._step * self.width, self._step * self.height]
 
-    def render(self, screen):
-        pygame.draw.rect(screen, self.BACKGROUND_COLOR, self.rect)
+    def _render_chunk(self, cx, cy):
+        k = self.map.CHUNK_SIZE
+        step = ATLAS().real_sprite_size  # chunks are drawn in the pixels of the sprites
+        col0, row0 = cx * k, cy * k
+        cols, rows = min(k, self.width - col0), min(k, self.height - row0)
+
+        surface = self._chunks.get((cx, cy))
+        if surface is None:
+            surface = self._chunks[(cx, cy)] = pygame.Surface((cols * step, rows * step)).convert()
+        surface.fill(self.BACKGROUND_COLOR)
 
-        for col in range(self.width):
-            for row in range(self.height):
-                cell = self.map.get_cell_by_col_row(col, row)
+        for col in range(cols):
+            for row in range(rows):
+                cell = self.map.get_cell_by_col_row(col0 + col, row0 + row)
                 if cell != cell.FREE:
-                    coords = self.map.coord_by_col_and_row(col, row)
-                    screen.blit(self._sprites[cell], coords)
+                    surface.blit(self._sprites[cell], (col * step, row * step))
+        return surface
+
+    def prerender(self):
+        cw, ch = self.map.chunks_size
+        for cx in range(cw):
+            for cy in range(ch):
+                self._render_chunk(cx, cy)
+        self.map.dirty_chunks.clear()
+
+    def render(self, screen):
+        # only the chunks inside the camera view
+        vx, vy, vw, vh = screen.visible_rect
+        fx, fy = self.position
+        chunk_px = self.map.CHUNK_SIZE * self._step
+        cw, ch = self.map.chunks_size
+        cx_min, cy_min = max(0, (vx - fx) // chunk_px), max(0, (vy - fy) // chunk_px)
+        cx_max = min(cw - 1, (vx + vw - 1 - fx) // chunk_px)
+        cy_max = min(ch - 1, (vy + vh - 1 - fy) // chunk_px)
+
+        dirty = self.map.dirty_chunks
+        for cx in range(cx_min, cx_max + 1):
+            for cy in range(cy_min, cy_max + 1):
+                key = cx, cy
+                if key in dirty or key not in self._chunks:
+                    surface = self._render_chunk(cx, cy)
+                    dirty.discard(key)
+                else:
+                    surface = self._chunks[key]
+                screen.blit(surface, (fx + cx * chunk_px, fy + cy * chunk_px))
 
         if FIELD_DEBUG:
             self.oc_map.render(screen)
 
     def intersect_rect(self, test_rect):
+        """
+        :param test_rect: tank rect (x, y, w, h), w and h must be positive
+        :return: True if the rect leaves the field or overlaps a blocking part of a cell
+        """
         x1, y1, w, h = test_rect
+        xs, ys = self.position
+        step = self._step
+
+        # relative to the field
+        x1 -= xs
+        y1 -= ys
         x2 = x1 + w
         y2 = y1 + h
 
-        check_pts = (
-            (x1, y1),
-            (x2, y1),
-            (x1, y2),
-            (x2, y2)
-        )
-
-        rmax = cmax = -1
-        rmin, cmin = self.height, self.width
-
-        for x, y in check_pts:
-            col, row = self.map.col_row_from_coords(x, y)
-            rmax = max(rmax, row)
-            rmin = min(rmin, row)
-            cmax = max(cmax, col)
-            cmin = min(cmin, col)
-
-        for c in range(cmin, cmax + 1):
-            for r in range(rmin, rmax + 1):
-                if not self.map.inside_col_row(c, r):
-                    return True
-
-                cell = self.map.get_cell_by_col_row(c, r)
-
-                if not cell.can_tank_run_here:
-                    x, y = self.map.coord_by_col_and_row(c, r)
-                    abs_cell_rect = cell.calculate_rect(x, y, self._step)
-                    if rect_intersection(test_rect, abs_cell_rect):
-                        return True
+        # a corner out of the field
+        if x1 < 0 or y1 < 0 or x2 // step >= self.width or y2 // step >= self.height:
+            return True
 
+        # half-cells which have common inner points with the rect
+        half = step // 2
+        col_min, col_max = x1 // half, -(-x2 // half) - 1
+        row_min, row_max = y1 // half, -(-y2 // half) - 1
+
+        mask = ((1 << (col_max - col_min + 1)) - 1) << col_min
+        rows = self.map.blocking_rows
+        for row in range(row_min, row_max + 1):
+            if rows[row] & mask:
+                return True
         return False
 
     def get_center_of_cell(self, col, row):
@@ -196,58 +242,134 @@ class Field(GameObject):
         return xs + col * self._step, ys + row * self._step
 
     def check_hit(self, p: Projectile):
-        candidates = set()
-        for x, y in p.split_for_aim():
-            cell = self.map.get_cell_by_coords(x, y)
-            if cell is None:
-                return True  # out of field - destroy
-            elif cell.solid:
-                col, row = self.map.col_row_from_coords(x, y)
-                candidates.add((col, row, x, y))
-
+        """
+        Test the three aim points of the projectile (see Projectile.split_for_aim)
+        against the terrain and break the cells they hit.
+        :return: True if the projectile hit something solid or left the field
+        """
+        x, y = p.position
+        xs, ys = self.position
+        x -= xs
+        y -= ys
+        dx, dy = self._aim_offsets[p.direction]
+        step = self._step
+        w, h = self.width, self.height
+
+        c0, r0 = x // step, y // step
+        c1, r1 = (x + dx) // step, (y + dy) // step
+        c2, r2 = (x - dx) // step, (y - dy) // step
+        if not (0 <= c0 < w and 0 <= r0 < h and
+                0 <= c1 < w and 0 <= r1 < h and
+                0 <= c2 < w and 0 <= r2 < h):
+            return True  # out of field - destroy
+
+        cols = self.map.columns
+        # solid before any of the points breaks anything
+        solid0 = cols[c0][r0] in SOLID_CELLS
+        solid1 = cols[c1][r1] in SOLID_CELLS
+        solid2 = cols[c2][r2] in SOLID_CELLS
+        if not (solid0 or solid1 or solid2):
+            return False
+
+        rules = self._hit_tables[p.direction][p.power]
         hit = False
-        for col, row, px, py in candidates:
-            cell = self.map.get_cell_by_col_row(col, row)  # type: CellType
-
-            cx, cy = self.map.coord_by_col_and_row(col, row)
-            abs_cell_rect = cell.calculate_rect(cx, cy, self._step)
-
-            if point_in_rect_eq(px, py, abs_cell_rect):
-                hit = True
-
-                powerful = p.power == p.POWER_HIGH
-
-                if cell == cell.BRICK:
-                    if powerful:
-                        new_cell = cell.FREE
-                    else:
-                        new_cell = {
-                            Direction.LEFT: cell.BRICK_LEFT,
-                            Direction.RIGHT: cell.BRICK_RIGHT,
-                            Direction.UP: cell.BRICK_TOP,
-                            Direction.DOWN: cell.BRICK_BOTTOM
-                        }[p.direction]
-                elif cell.is_half_brick:
-                    new_cell = cell.FREE
-                elif cell == cell.CONCRETE and powerful:
-                    new_cell = cell.FREE
-                else:
-                    continue
-                self.map.set_cell_col_row(col, row, new_cell)
-
+        if solid0:
+            hit = self._hit_cell(rules, c0, r0, x - c0 * step, y - r0 * step)
+        if solid1:
+            hit = self._hit_cell(rules, c1, r1, x + dx - c1 * step, y + dy - r1 * step) or hit
+        if solid2:
+            hit = self._hit_cell(rules, c2, r2, x - dx - c2 * step, y - dy - r2 * step) or hit
         return hit
 
-    @staticmethod
-    def respawn_points(is_enemy):
+    def first_solid_step(self, p: Projectile, first, last):
+        """
+        Walk the cells along the path of the projectile (DDA along its axis) from its position.
+        :return: the first step in first..last (see Projectile.position_after) where one of its aim points
+        is in a solid cell or out of the field - where check_hit may hit something; None if there is no such step
+        """
+        if first > last:
+            return None
+        x, y = p.position
+        xs, ys = self.position
+        dx, dy = self._aim_offsets[p.direction]
+        vx, vy = p.direction.vector
+        step = self._step
+        speed = p.SPEED
+        if vx:
+            # along a row: the aim points keep their rows, the column changes
+            axis, size = x - xs, self.width
+            lines = [(y + o - ys) // step for o in (0, dy, -dy)]
+            v = vx
+        else:
+            axis, size = y - ys, self.height
+            lines = [(x + o - xs) // step for o in (0, dx, -dx)]
+            v = vy
+        across = self.height if vx else self.width
+        if not all(0 <= line < across for line in lines):
+            return first
+
+        cols = self.map.columns
+        c = (axis + v * speed * first) // step
+        c_last = (axis + v * speed * last) // step
+        while True:
+            if not 0 <= c < size:
+                solid = True
+            elif vx:
+                column = cols[c]
+                solid = any(column[r] in SOLID_CELLS for r in lines)
+            else:
+                solid = any(cols[col][c] in SOLID_CELLS for col in lines)
+            if solid:
+                # the first step which gets into cell c
+                if v > 0:
+                    k = -((axis - c * step) // speed) if c * step > axis else 0
+                else:
+                    k = (axis - (c + 1) * step) // speed + 1
+                return max(first, k)
+            if c == c_last:
+                return None
+            c += v
+
+    def _hit_cell(self, rules, col, row, ox, oy):
+        half = self._step // 2
+        cell = self.map.columns[col][row]
+        new_cell = rules[cell][((ox > half) - (ox < half) + 1) * 3 + (oy > half) - (oy < half) + 1]
+        if new_cell is None:
+            return False
+        if new_cell is not cell:
+            self.map.set_cell_col_row(col, row, new_cell)
+            if self.events is not None:
+                self.events.emit(BrickDestroyed(col, row, cell, new_cell))
+        return True
+
+    def respawn_points(self, is_enemy):
+        mid = self.width // 2
         return [
             (1, 1),
-            (13, 1),
-            (25, 1)
+            (mid, 1),
+            (self.width - 1, 1)
         ] if is_enemy else [
-            (10, 25),
-            (16, 25)
+            (mid - 3, self.height - 1),
+            (mid + 3, self.height - 1)
         ]
 
+    def tank_positions(self, step=2):
+        """
+        (col, row) of cell corners where a tank (2 x 2 cells around the corner) can stand,
+        every step cells
+        """
+        m = self.map
+        for row in range(step, m.height - 1, step):
+            for col in range(step, m.width - 1, step):
+                cells = (m.get_cell_by_col_row(col - dc, row - dr) for dc in (0, 1) for dr in (0, 1))
+                if all(c.can_tank_run_here for c in cells):
+                    yield col, row
+
+    @property
+    def base_location(self):
+        """col, row of the top-left cell of the base (2x2 cells at the bottom center)"""
+        return self.width // 2 - 1, self.height - 2
+
     def is_free_location_to_place_tank(self, x, y):
         lx, ly = self.map.coord_by_col_and_row(x, y)
         bb = lx - self._step, ly - self._step, self._step * 2, self._step * 2
@@ -7,32 +7,72 @@ from ui import *
 from explosion import Explosion
 from my_base import MyBase
 from bonus import Bonus, BonusType
-from ai import EnemyFractionAI
+from ai import EnemyFractionAI, TANK_AIS
 from bonus_field_protect import FieldProtector
 from score_node import ScoreLayer
+from levels import get_level_pack
+from camera import Camera
+from config import VIEWPORT, get_render_scale
+from events import EventBus, TankDestroyed, BonusPicked, BaseHit, ProjectileFired, GameFinished
 import random
-import time
-import datetime
 
 
 class Game:
     ENEMIES_PER_LEVEL = 20
 
-    def __init__(self):
-        self.r = random.Random()
+    KILL_SCORE = {
+        Tank.Type.ENEMY_SIMPLE: 100,
+        Tank.Type.ENEMY_FAST: 200,
+        Tank.Type.ENEMY_MIDDLE: 300,
+        Tank.Type.ENEMY_HEAVY: 400,
+    }
+
+    def __init__(self, level='level1', fixed_step=None, seed=None, enemy_ai='walker', tick_scale=1, time_scale=1,
+                 decision_budget_us=EnemyFractionAI.DECISION_BUDGET_US):
+        """
+        :param level: level name in the level pack, Level or None for an empty field
+        :param fixed_step: game time per update in seconds, None to follow the real time
+        :param seed: seed of the random numbers of this game, a game with the same level, seed,
+        fixed step and no decision budget plays the same way (in any process or thread, next to any other games)
+        :param enemy_ai: name of the enemy AI variant (ai.TANK_AIS)
+        :param tick_scale: fixed steps simulated by one update (fast-forward), needs fixed_step
+        :param time_scale: game time per real time for the loops which pace the updates with ticks(),
+        from 0.25 to 16 or None for as fast as possible, needs fixed_step
+        :param decision_budget_us: CPU time for the enemy decisions per tick (EnemyFractionAI), it depends
+        on the speed of the machine: None for the games which must replay the same way
+        """
+        if tick_scale != 1 and fixed_step is None:
+            raise ValueError('tick_scale needs a fixed step')
+        # timers of everything created for this game run on its clock
+        self.scheduler = Scheduler(fixed_step, tick_scale)
+        self.scheduler.activate()
+        self.pacer = TickPacer(fixed_step and fixed_step * tick_scale, time_scale)
+
+        self.random = random.Random(seed)
         self.scene = GameObject()
         self.running = True
         self.score = 0
 
+        # events of the current tick, handed to the subscribers after update()
+        self.events = EventBus()
+        self.events.subscribe(self._on_tanks_destroyed, TankDestroyed)
+
         # field
-        self.field = Field()
-        self.field.load_from_file('data/level1.txt')
+        if isinstance(level, str):
+            level = get_level_pack().get(level)
+        self.level = level
+        if level:
+            self.field = Field(level.width, level.height)
+            self.field.load_level(level)
+        else:
+            self.field = Field()
+        self.field.events = self.events
         self.scene.add_child(self.field)
         self.field_protector = FieldProtector(self.field)
 
         # base
         self.my_base = MyBase()
-        self.my_base.position = self.field.map.coord_by_col_and_row(12, 24)
+        self.my_base.position = self.field.map.coord_by_col_and_row(*self.field.base_location)
         self.scene.add_child(self.my_base)
 
         # tanks
@@ -42,7 +82,8 @@ class Game:
         self.make_my_tank()
 
         # AI
-        self.ai = EnemyFractionAI(self.field, self.tanks, total_enemies=self.ENEMIES_PER_LEVEL)
+        self.ai = EnemyFractionAI(self.field, self.tanks, total_enemies=self.ENEMIES_PER_LEVEL,
+                                  decision_budget_us=decision_budget_us, rng=self.random, tank_ai=TANK_AIS[enemy_ai])
 
         # projectiles
         self.projectiles = GameObject()
@@ -57,8 +98,8 @@ class Game:
         self.scene.add_child(self.score_layer)
 
         self.freeze_timer = Timer(10)
-        self.freeze_timer.done = True
         self.font_debug = pygame.font.Font(None, 18)
+        self.text_cache = TextCache(self.font_debug)
 
         # UI message
         self._msg = None
@@ -70,11 +111,32 @@ class Game:
         self.win_label = None
 
         # test bonus
-        self.make_bonus(*self.field.map.coord_by_col_and_row(13, 22), BonusType.TOP_TANK)
+        base_col, base_row = self.field.base_location
+        self.make_bonus(*self.field.map.coord_by_col_and_row(base_col + 1, base_row - 2), BonusType.TOP_TANK)
+
+        # camera: the field is shown in the viewport, big maps are scrolled
+        vx, vy, vw, vh = VIEWPORT
+        _, _, fw, fh = self.field.rect
+        self.viewport = (vx, vy, min(vw, fw), min(vh, fh))
+        scale = get_render_scale()
+        if scale == 1:
+            self.camera = Camera(self.viewport, self.field.rect)
+        else:
+            # native resolution: the field is drawn into a small frame, the frame is scaled to the viewport
+            self.camera = Camera((0, 0, self.viewport[2] // scale, self.viewport[3] // scale), self.field.rect, scale)
+        self._frame = self._frame_target = None
+
+        # order matters; tools like bench.py wrap these to time each phase
+        self.update_phases = [
+            ('field_protector', self.field_protector.update),
+            ('tanks', self.update_tanks),
+            ('bonuses', self.update_bonuses),
+            ('projectiles', self.update_projectiles),
+        ]
 
     def respawn_tank(self, t: Tank):
         is_friend = self.is_friend(t)
-        pos = random.choice(self.field.respawn_points(not is_friend))
+        pos = self.random.choice(self.field.respawn_points(not is_friend))
         t.place(self.field.get_center_of_cell(*pos))
         if is_friend:
             t.tank_type = t.Type.LEVEL_1
@@ -108,31 +170,24 @@ class Game:
 
         self.tanks.add_child(new_tank)
         self.my_tank = new_tank
-        print(f"Switched tank to {next_type.name}")
 
     @property
     def frozen_enemy_time(self):
         return not self.freeze_timer.done
 
-    def _on_destroyed_tank(self, t: Tank):
-        if t.is_bonus:
-            self.make_bonus(*t.center_point)
-        if t.fraction == t.ENEMY:
-            if t.tank_type == t.Type.ENEMY_SIMPLE:
-                ds = 100
-            elif t.tank_type == t.Type.ENEMY_FAST:
-                ds = 200
-            elif t.tank_type == t.Type.ENEMY_MIDDLE:
-                ds = 300
-            elif t.tank_type == t.Type.ENEMY_HEAVY:
-                ds = 400
-            else:
-                ds = 0
-            self.score += ds
-            self.score_layer.add(*t.center_point, ds)
+    def _on_tanks_destroyed(self, events):
+        for e in events:
+            t = e.tank
+            # only enemies shot down by someone give a bonus and score
+            if e.killer is None or t.fraction != t.ENEMY:
+                continue
+            if t.is_bonus:
+                self.make_bonus(e.x, e.y)
+            # the score itself is counted by hit_tank
+            self.score_layer.add(e.x, e.y, self.KILL_SCORE.get(t.tank_type, 0))
 
     def make_bonus(self, x, y, t=None):
-        bonus = Bonus(BonusType.random() if t is None else t, x, y)
+        bonus = Bonus(BonusType.random(self.random) if t is None else t, x, y)
         self.bonuses.add_child(bonus)
 
     def make_explosion(self, x, y, expl_type):
@@ -150,6 +205,7 @@ class Game:
             power = Projectile.POWER_HIGH if tank.tank_type.can_crash_concrete else Projectile.POWER_NORMAL
             projectile = Projectile(*tank.gun_point, tank.direction, sender=tank, power=power)
             self.projectiles.add_child(projectile)
+            self.events.emit(ProjectileFired(projectile, tank))
 
     def move_tank(self, direction: Direction, tank=None):
         tank = self.my_tank if tank is None else tank
@@ -181,14 +237,14 @@ class Game:
             self.show_message(f"TOP_TANK: switched to {self.my_tank.tank_type.name}")
         elif bonus == BonusType.GUN:
             self.show_message("GUN: not implemented")
-            print("Bonus GUN picked (no effect implemented).")
         else:
-            print(f'Bonus {bonus} not implemented yet.')
+            self.show_message(f"{bonus.name}: not implemented")
 
     def update_bonuses(self):
         for b in list(self.bonuses):  # type: Bonus
             if b.intersects_rect(self.my_tank.bounding_rect):
                 b.remove_from_parent()
+                self.events.emit(BonusPicked(self.my_tank, b.type, *self.my_tank.center_point))
                 self.apply_bonus(self.my_tank, b.type)
 
     @property
@@ -208,32 +264,21 @@ class Game:
         except Exception:
             return False
 
-    def _log_result(self, result_label: str):
-        try:
-            with open('results.log', 'a') as f:
-                f.write(f"{datetime.datetime.now().isoformat()} {result_label} score={self.score}\n")
-        except Exception as e:
-            print("Failed to write results.log:", e)
-
     def _on_win(self):
         if not getattr(self, '_won', False):
             self._won = True
-            self._log_result("WIN")
             self.show_message("YOU WIN!")
-            print("WIN - score:", self.score)
+            self.events.emit(GameFinished(True, self.score))
             self.ai.total_to_spawn = 0
             self.ai.stop_all_moving()
             self.win_label = GameWinLabel()
 
     def make_game_over(self):
-        if not self.my_base.broken:
-            self.my_base.broken = True
+        self.my_base.broken = True
         go = GameOverLabel()
-        go.place_at_center(self.field)
-        self.scene.add_child(go)
-        self._log_result("LOSE")
+        go.place_at_center(self.viewport)
         self.show_message("GAME OVER")
-        print("GAME OVER - score:", self.score)
+        self.events.emit(GameFinished(False, self.score))
         self.over_label = go
 
     def update_tanks(self):
@@ -247,7 +292,6 @@ class Game:
             else:
                 self.move_tank(self.my_tank_move_to_direction, self.my_tank)
 
-        self.freeze_timer.tick()
         if self.frozen_enemy_time:
             self.ai.stop_all_moving()
         else:
@@ -259,15 +303,26 @@ class Game:
                 self.fire(tank)
             if tank.to_destroy:
                 tank.remove_from_parent()
-            bb = tank.bounding_rect
-            if not self.field.oc_map.test_rect(bb, good_values=(None, tank)):
-                push_back = True
-            else:
-                push_back = self.field.intersect_rect(bb)
-            if push_back:
-                tank.undo_move()
-
-    def hit_tank(self, t: Tank):
+            if self._blocked(tank):
+                if tank.moving and tank.position != tank.old_position and self.scheduler.tick_scale > 1:
+                    # a long move: keep the part of it before the obstacle
+                    for _ in range(self.scheduler.tick_scale - 1):
+                        tank.step_back()
+                        if not self._blocked(tank):
+                            break
+                    else:
+                        tank.undo_move()
+                else:
+                    tank.undo_move()
+
+    def _blocked(self, tank):
+        bb = tank.bounding_rect
+        if not self.field.oc_map.test_rect(bb, good_values=(None, tank)):
+            return True
+        return self.field.intersect_rect(bb)
+
+    def hit_tank(self, t: Tank, killer: Tank = None):
+        x, y = t.center_point
         destroy = False
         if self.is_friend(t):
             destroy = True
@@ -278,12 +333,16 @@ class Game:
             if t.to_destroy:
                 destroy = True
                 t.remove_from_parent()
-                self._on_destroyed_tank(t)
         if destroy:
-            self.make_explosion(*t.center_point, Explosion.TYPE_FULL)
+            self.make_explosion(x, y, Explosion.TYPE_FULL)
+            if killer is not None and t.fraction == t.ENEMY:
+                # at once, not when the events are flushed: GameFinished of this tick reports the score
+                self.score += self.KILL_SCORE.get(t.tank_type, 0)
+            self.events.emit(TankDestroyed(t, killer, x, y))
 
     def kill_tank(self, t: Tank):
         self.make_explosion(*t.center_point, Explosion.TYPE_FULL)
+        self.events.emit(TankDestroyed(t, None, *t.center_point))
         if self.is_friend(t):
             self.respawn_tank(t)
         else:
@@ -296,55 +355,130 @@ class Game:
         self._msg_timer.start()
 
     def update_projectiles(self):
+        # with tick_scale > 1 a projectile moves several steps (SPEED) per tick: its whole path is tested
+        # and it stops at the first step where it meets something, as if the ticks were short
+        oc_map = self.field.oc_map
+        starts = {}
         for p in list(self.projectiles):  # type: Projectile
-            r = extend_rect((*p.position, 0, 0), 2)
-            self.field.oc_map.fill_rect(r, p)
+            x0, y0 = starts[p] = p.position
+            x1, y1 = p.position_after(p.steps - 1)
+            r = extend_rect((min(x0, x1), min(y0, y1), abs(x1 - x0), abs(y1 - y0)), 2)
+            oc_map.fill_rect(r, p)
 
         remove_projectiles_waitlist = set()
+        met = {}  # projectile -> step where another one met it
         for p in list(self.projectiles):
-            p.update()
-            something = self.field.oc_map.get_cell_by_coords(*p.position)
-            if something and something is not p and isinstance(something, Projectile):
+            x0, y0 = p.position
+            vx, vy = p.direction.vector
+            vx *= p.SPEED
+            vy *= p.SPEED
+            stop = met.get(p, p.steps)
+
+            tank_step, tank = None, None
+            for t in self.all_mature_tanks:
+                if t is not p.sender:
+                    k = first_step_in_rect(x0, y0, vx, vy, tank_step or stop, t.bounding_rect)
+                    if k is not None and (tank_step is None or k < tank_step):
+                        tank_step, tank = k, t
+            stop = tank_step or stop
+
+            base_step = first_step_in_rect(x0, y0, vx, vy, stop, self.my_base.bounding_rect)
+            if base_step is not None and not self.my_base.check_hit(x0 + vx * base_step, y0 + vy * base_step):
+                base_step = None
+            stop = base_step or stop
+
+            projectile_step, other = None, None
+            for k in range(1, stop + 1):
+                x, y = x0 + vx * k, y0 + vy * k
+                if p.steps == 1:
+                    something = oc_map.get_cell_by_coords(x, y)
+                    if something and something is not p and isinstance(something, Projectile):
+                        projectile_step, other = k, something
+                else:
+                    # the swept rects overlap in oc_map, which keeps one object per cell
+                    for q, start in starts.items():
+                        if q is not p and self._projectiles_meet(p, starts[p], q, start, k):
+                            projectile_step, other = k, q
+                            met[q] = k  # the other one stops there too
+                            break
+                if other is not None:
+                    stop = k
+                    break
+
+            # terrain, up to the first of the others: the cells are broken in the order of the steps
+            struck_terrain = False
+            k = 0
+            while k < stop:
+                j = self.field.first_solid_step(p, 1, stop - k)
+                if j is None:
+                    break
+                k += j
+                p.position = x0 + vx * k, y0 + vy * k
+                if self.field.check_hit(p):
+                    struck_terrain = True
+                    stop = k
+                    break
+            x, y = p.position = x0 + vx * stop, y0 + vy * stop
+
+            if projectile_step == stop:
                 remove_projectiles_waitlist.add(p)
-                remove_projectiles_waitlist.add(something)
+                remove_projectiles_waitlist.add(other)
 
             was_stricken_object = False
-            x, y = p.position
-            if self.field.check_hit(p):
+            if struck_terrain:
                 was_stricken_object = True
                 self.make_explosion(*p.position, Explosion.TYPE_SUPER_SHORT)
-            elif self.my_base.check_hit(x, y):
-                self.make_game_over()
+            elif base_step == stop:
+                # the game is over after this tick, see update()
+                self.my_base.broken = True
+                self.events.emit(BaseHit(p, x, y))
                 was_stricken_object = True
                 self.make_explosion(*self.my_base.center_point, Explosion.TYPE_FULL)
-            else:
-                for t in self.all_mature_tanks:
-                    if t is not p.sender and t.check_hit(x, y):
-                        was_stricken_object = True
-                        if not t.shielded and p.sender.fraction != t.fraction:
-                            self.make_explosion(*p.position, Explosion.TYPE_SHORT)
-                            self.hit_tank(t)
-                        break
+            elif tank_step == stop:
+                was_stricken_object = True
+                if not tank.shielded and p.sender.fraction != tank.fraction:
+                    self.make_explosion(*p.position, Explosion.TYPE_SHORT)
+                    self.hit_tank(tank, p.sender)
             if was_stricken_object:
                 remove_projectiles_waitlist.add(p)
 
         for p in remove_projectiles_waitlist:
             p.remove_from_parent()
 
+    @staticmethod
+    def _projectiles_meet(p, p_start, q, q_start, step):
+        """do the paths of two projectiles touch during their step-th step of this tick"""
+        def path(projectile, start):
+            vx, vy = projectile.direction.vector
+            x0, y0 = start[0] + vx * projectile.SPEED * (step - 1), start[1] + vy * projectile.SPEED * (step - 1)
+            x1, y1 = x0 + vx * projectile.SPEED, y0 + vy * projectile.SPEED
+            return extend_rect((min(x0, x1), min(y0, y1), abs(x1 - x0), abs(y1 - y0)), 2)
+        return rect_intersection_eq(path(p, p_start), path(q, q_start))
+
+    @property
+    def time_scale(self):
+        return self.pacer.scale
+
+    @time_scale.setter
+    def time_scale(self, scale):
+        self.pacer.scale = scale
+
+    def ticks(self):
+        """yields for every update due by the real clock and the time scale, see util.TickPacer"""
+        return self.pacer.ticks()
+
     def update(self):
         if not self.running:
             return
 
+        self.scheduler.activate()
+        self.scheduler.advance()
+
         self.field.oc_map.clear()
         self.field.oc_map.fill_rect(self.my_base.bounding_rect, self.my_base)
 
-        self.field_protector.update()
-        self.score_layer.update()
-
-        self.update_tanks()
-        self.update_bonuses()
-        self.update_projectiles()
-        self._msg_timer.tick()
+        for _, phase in self.update_phases:
+            phase()
 
         if self.is_game_over:
             self.running = False
@@ -353,23 +487,42 @@ class Game:
             self.running = False
             self._on_win()
 
+        self.events.flush()
+
+    def _render_native(self, screen):
+        if self._frame is None:
+            self._frame = pygame.Surface(self.camera.viewport[2:]).convert()
+        if self._frame_target is None or self._frame_target.get_parent() is not screen:
+            self._frame_target = screen.subsurface(self.viewport)
+        self._frame.fill(self.field.BACKGROUND_COLOR)
+        self.camera.begin(self._frame)
+        self.scene.visit(self.camera)
+        self.camera.end()
+        # one nearest neighbour upscale straight into the screen, no new surface per frame
+        pygame.transform.scale(self._frame, self.viewport[2:], self._frame_target)
+
     def render(self, screen):
-        self.scene.visit(screen)
+        if self.my_tank:
+            self.camera.follow(self.my_tank.position)
+        if self.camera.scale == 1:
+            self.camera.begin(screen)
+            self.scene.visit(self.camera)
+            self.camera.end()
+        else:
+            self._render_native(screen)
+
+        text = self.text_cache.render
 
-        score_label = self.font_debug.render(str(self.score), 1, (255, 255, 255))
-        screen.blit(score_label, (GAME_WIDTH - 50, 5))
+        screen.blit(text(str(self.score)), (GAME_WIDTH - 50, 5))
 
         dbg_text = f'Objects: {self.scene.total_children - 1}'
         if self.is_game_over:
             dbg_text = 'Press R to restart! ' + dbg_text
-        dbg_label = self.font_debug.render(dbg_text, 1, (255, 255, 255))
-        screen.blit(dbg_label, (5, 5))
+        screen.blit(text(dbg_text), (5, 5))
 
         try:
             t = self.my_tank
-            shield_remaining = 0.0
-            if hasattr(t, '_shield_timer') and not t._shield_timer.done:
-                shield_remaining = max(0.0, round(t._shield_timer.delay - (time.monotonic() - t._shield_timer.last_time), 1))
+            shield_remaining = round(t._shield_timer.remaining, 1)
             level = t.tank_type.name
             hud = f'Level: {level}  Shield: {shield_remaining}s'
         except Exception:
@@ -377,13 +530,11 @@ class Game:
         enemies_left = self.ai.enemies_left_to_spawn
         enemies_left_text = str(enemies_left) if enemies_left is not None else '∞'
         hud2 = f'Enemies left: {enemies_left_text}  Score: {self.score}'
-        hud_label = self.font_debug.render(hud, 1, (255, 255, 255))
-        hud2_label = self.font_debug.render(hud2, 1, (255, 255, 255))
-        screen.blit(hud_label, (5, GAME_HEIGHT - 40))
-        screen.blit(hud2_label, (5, GAME_HEIGHT - 22))
+        screen.blit(text(hud), (5, GAME_HEIGHT - 40))
+        screen.blit(text(hud2), (5, GAME_HEIGHT - 22))
 
         if self._msg and not self._msg_timer.done:
-            msg_label = self.font_debug.render(self._msg, 1, (255, 255, 0))
+            msg_label = text(self._msg, (255, 255, 0))
             mx = (GAME_WIDTH - msg_label.get_width()) // 2
             my = 10
             screen.blit(msg_label, (mx, my))
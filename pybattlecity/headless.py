@@ -0,0 +1,97 @@
+import os
+import time
+from collections import namedtuple
+
+import pygame
+from config import GAME_WIDTH, GAME_HEIGHT, TICK_TIME, MAX_MATCH_TICKS, SCREEN_COLOR
+
+MatchResult = namedtuple('MatchResult', ('level', 'seed', 'finished', 'victory', 'score', 'ticks', 'seconds',
+                                         'enemy_ai', 'decisions', 'decision_ns'))
+
+
+def init_headless(size=(GAME_WIDTH, GAME_HEIGHT)) -> pygame.Surface:
+    """
+    Initialize pygame without a real window (SDL dummy drivers).
+    The sprite atlas needs a display surface to convert images, so we still create one.
+    :return: off-screen surface of the given size
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.display.init()
+    pygame.font.init()
+    return pygame.display.set_mode(size)
+
+
+def run_match(level, seed, max_ticks=MAX_MATCH_TICKS, inputs=None, screen=None,
+              fixed_step=TICK_TIME, capture=None, view=None, speed=None, enemy_ai='walker',
+              autopilot=False, tick_scale=1, recording=None) -> MatchResult:
+    """
+    Play a seeded game with a fixed step until it is finished or max_ticks pass.
+    :param inputs: tick -> replay.TickInput, the player stays idle if None
+    :param screen: render every tick to this surface if given
+    :param capture: capture.FrameCapture, gets every rendered frame
+    :param view: gets render(game) after every tick, like textview.TextView
+    :param speed: play this many times faster than the real time, as fast as possible if None
+    :param enemy_ai: name of the enemy AI variant (ai.TANK_AIS)
+    :param autopilot: the player is driven by autopilot.Autopilot instead of the inputs
+    :param tick_scale: every tick simulates this many fixed steps (Game), max_ticks counts the long ticks
+    :param recording: replay.Recording, gets the input of every tick and the result, as main.play records
+    """
+    from game import Game
+    from events import GameFinished
+    from replay import apply_input
+
+    # the same seed plays the same way on any machine: no decision time budget
+    game = Game(level, fixed_step=fixed_step, seed=seed, enemy_ai=enemy_ai, tick_scale=tick_scale,
+                decision_budget_us=None)
+    finished = []
+    game.events.subscribe(finished.extend, GameFinished)
+    if autopilot:
+        from autopilot import Autopilot
+        inputs = Autopilot(game)
+    if recording is not None:
+        def on_finished(events):
+            e = events[0]
+            recording.result = {'victory': e.victory, 'score': e.score, 'ticks': tick + 1}
+        game.events.subscribe(on_finished, GameFinished)
+
+    t0 = time.perf_counter()
+    tick = 0
+    while tick < max_ticks and not finished:
+        if inputs is not None:
+            inp = inputs(tick)
+            if recording is not None:
+                recording.record(tick, inp)
+            apply_input(game, inp)
+        game.update()
+        if screen is not None:
+            screen.fill(SCREEN_COLOR)
+            game.render(screen)
+            if capture is not None:
+                capture.capture(screen)
+        if view is not None:
+            view.render(game)
+        tick += 1
+        if speed:
+            delay = t0 + tick * fixed_step * tick_scale / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    seconds = time.perf_counter() - t0
+
+    victory = bool(finished) and finished[0].victory
+    return MatchResult(game.level.name if game.level else None, seed, bool(finished), victory,
+                       game.score, tick, round(seconds, 3), enemy_ai, game.ai.decisions, game.ai.decision_ns)
+
+
+def check_replay(level, seed, max_ticks=MAX_MATCH_TICKS):
+    """
+    Record an autopilot game and replay the recording.
+    :return: the recorded result and the replayed one, {'victory':, 'score':, 'ticks':} or None if unfinished
+    """
+    from replay import Recording
+    recording = Recording(level, seed, TICK_TIME)
+    run_match(level, seed, max_ticks, autopilot=True, recording=recording)
+    r = run_match(recording.level, recording.seed, max_ticks, inputs=recording.inputs(),
+                  fixed_step=recording.fixed_step)
+    replayed = {'victory': r.victory, 'score': r.score, 'ticks': r.ticks} if r.finished else None
+    return recording.result, replayed
@@ -0,0 +1,195 @@
+"""
+Level pack: text levels from data/ compiled once to a compact binary grid.
+
+Text format: one row of cell symbols per line (see terrain.CELL_BY_SYMBOL),
+everything after '#' is a comment. The compiled grid stores one byte per cell
+(CellType value) in column-major order, like DiscreteMap keeps its cells.
+Compiled levels are cached on disk together with the hash of the source text,
+so the text is parsed again only when it changes.
+"""
+import hashlib
+import os
+import re
+import struct
+
+from terrain import CellType, CELL_BY_SYMBOL
+
+
+LEVELS_DIR = 'data'
+CACHE_DIR = os.path.join(LEVELS_DIR, 'cache')
+LEVEL_EXT = '.txt'
+CACHE_EXT = '.lvl'
+
+_CELL_BY_CODE = [None] * (max(c.value for c in CellType) + 1)
+for _c in CellType:
+    _CELL_BY_CODE[_c.value] = _c
+_CODE_BY_SYMBOL = {s: c.value for s, c in CELL_BY_SYMBOL.items()}
+
+
+class LevelError(ValueError):
+    pass
+
+
+class Level:
+    # magic, format version, width, height, sha1 of the source text
+    HEADER = struct.Struct('<4sBHH20s')
+    MAGIC = b'PBCL'
+    VERSION = 1
+
+    def __init__(self, name, width, height, cells: bytes, digest: bytes):
+        assert len(cells) == width * height, "cells do not match the size"
+        self.name = name
+        self.width = width
+        self.height = height
+        self.cells = cells
+        self.digest = digest
+        self._columns = None
+
+    @staticmethod
+    def hash_source(data: bytes):
+        return hashlib.sha1(data).digest()
+
+    @classmethod
+    def compile(cls, name, data: bytes):
+        rows = [line.split('#', 1)[0].rstrip() for line in data.decode('ascii').splitlines()]
+        while rows and not rows[-1]:
+            rows.pop()
+        if not rows:
+            raise LevelError(f'{name}: empty level')
+
+        width, height = len(rows[0]), len(rows)
+        cells = bytearray(width * height)
+        for row, line in enumerate(rows):
+            if len(line) < width:
+                raise LevelError(f'{name}: incomplete line {row}')
+            for col in range(width):
+                try:
+                    cells[col * height + row] = _CODE_BY_SYMBOL[line[col]]
+                except KeyError:
+                    raise LevelError(f'{name}: unknown symbol {line[col]!r} at {col}, {row}') from None
+
+        return cls(name, width, height, bytes(cells), cls.hash_source(data))
+
+    @classmethod
+    def from_file(cls, filename, name=None):
+        with open(filename, 'rb') as f:
+            data = f.read()
+        if name is None:
+            name = os.path.splitext(os.path.basename(filename))[0]
+        return cls.compile(name, data)
+
+    def to_bytes(self):
+        return self.HEADER.pack(self.MAGIC, self.VERSION, self.width, self.height, self.digest) + self.cells
+
+    @classmethod
+    def from_bytes(cls, name, data: bytes):
+        magic, version, width, height, digest = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise LevelError(f'{name}: not a compiled level or an old format')
+        cells = data[cls.HEADER.size:]
+        if len(cells) != width * height:
+            raise LevelError(f'{name}: truncated compiled level')
+        return cls(name, width, height, cells, digest)
+
+    @property
+    def columns(self):
+        """template for DiscreteMap cells, built once per level"""
+        if self._columns is None:
+            h = self.height
+            self._columns = [[_CELL_BY_CODE[code] for code in self.cells[col * h:(col + 1) * h]]
+                             for col in range(self.width)]
+        return self._columns
+
+    def copy_columns(self):
+        return [col[:] for col in self.columns]
+
+    def tiled(self, times_x, times_y):
+        """a bigger level made of copies of this one"""
+        h = self.height
+        column_bytes = [self.cells[col * h:(col + 1) * h] * times_y for col in range(self.width)]
+        cells = b''.join(column_bytes) * times_x
+        name = f'{self.name}x{times_x}x{times_y}'
+        return Level(name, self.width * times_x, self.height * times_y, cells, self.hash_source(cells))
+
+    def __str__(self):
+        h = self.height
+        return '\n'.join(
+            ''.join(_CELL_BY_CODE[self.cells[col * h + row]].symbol for col in range(self.width))
+            for row in range(h)
+        )
+
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+class LevelPack:
+    def __init__(self, directory=LEVELS_DIR, cache_dir=CACHE_DIR):
+        self.directory = directory
+        self.cache_dir = cache_dir
+        self._levels = {}
+        self.names = self.discover()
+
+    def discover(self):
+        names = [os.path.splitext(f)[0] for f in os.listdir(self.directory) if f.endswith(LEVEL_EXT)]
+        return sorted(names, key=_natural_key)
+
+    def source_path(self, name):
+        return os.path.join(self.directory, name + LEVEL_EXT)
+
+    def cache_path(self, name):
+        return os.path.join(self.cache_dir, name + CACHE_EXT)
+
+    def _load_cached(self, name, digest):
+        try:
+            with open(self.cache_path(name), 'rb') as f:
+                level = Level.from_bytes(name, f.read())
+        except (OSError, struct.error, LevelError):
+            return None
+        return level if level.digest == digest else None
+
+    def _store_cached(self, level: Level):
+        path = self.cache_path(level.name)
+        tmp_path = path + '.tmp'
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(level.to_bytes())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Can't cache level {level.name}: {e}")
+
+    def get(self, name) -> Level:
+        level = self._levels.get(name)
+        if level is None:
+            with open(self.source_path(name), 'rb') as f:
+                data = f.read()
+            level = self._load_cached(name, Level.hash_source(data))
+            if level is None:
+                level = Level.compile(name, data)
+                self._store_cached(level)
+            self._levels[name] = level
+        return level
+
+    def load_all(self):
+        return [self.get(name) for name in self.names]
+
+    def next_name(self, name):
+        i = self.names.index(name) if name in self.names else -1
+        return self.names[(i + 1) % len(self.names)]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+_pack = None
+
+
+def get_level_pack() -> LevelPack:
+    global _pack
+    if _pack is None:
+        _pack = LevelPack()
+    return _pack
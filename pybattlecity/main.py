@@ -1,52 +1,184 @@
+import random
+import sys
+import time
+
 import pygame
 from pygame.locals import *
-from game import Game
-from config import *
-from util import Direction
 
+import config
+
+# the game modules are imported by the functions: they copy the debug flags
+# with "from config import *", which cli.configure() sets before play() runs
+
+
+def new_game(level, fixed_step, seed, decision_budget_us):
+    from game import Game
+    from events import ResultLogger, print_events, GameFinished, BonusPicked
+    game = Game(level, fixed_step=fixed_step, seed=seed, decision_budget_us=decision_budget_us)
+    game.events.subscribe(ResultLogger(), GameFinished)
+    game.events.subscribe(print_events, GameFinished, BonusPicked)
+    return game
+
+
+def read_move(keys):
+    from util import Direction
+    if keys[pygame.K_UP] or keys[pygame.K_w]:
+        return Direction.UP
+    elif keys[pygame.K_DOWN] or keys[pygame.K_s]:
+        return Direction.DOWN
+    elif keys[pygame.K_LEFT] or keys[pygame.K_a]:
+        return Direction.LEFT
+    elif keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+        return Direction.RIGHT
+    return None
+
+
+def play(level=None, seed=None, record=None, frame_gc=False, gc_stats=False, autopilot=False, time_scale=1,
+         render_every_tick=False):
+    """
+    :param level: level name, the first level of the pack if None
+    :param seed: seed of the random numbers of every game, a new one per game if None
+    :param record: save the input of the first game to this file (see replay.py)
+    :param frame_gc: run the garbage collector only between frames (see memstats.FrameGC)
+    :param gc_stats: print the garbage collector pauses at exit
+    :param autopilot: start with the player tank driven by autopilot.Autopilot (P switches it)
+    :param time_scale: game time per real time, 0.25 to 16 or None for as fast as possible ([ and ] change it)
+    :param render_every_tick: draw every tick, not only the last one of a frame
+    """
+    from config import GAME_WIDTH, GAME_HEIGHT, TICK_TIME, SCREEN_COLOR, FRAME_RATE
+    from levels import get_level_pack
+    from events import GameFinished
+    from preload import GamePreloader
+    from replay import TickInput, Recording, apply_input
+    from memstats import FrameGC, GCMonitor
+    from autopilot import Autopilot
+    from ai import EnemyFractionAI
 
-if __name__ == '__main__':
     pygame.init()
     screen = pygame.display.set_mode((GAME_WIDTH, GAME_HEIGHT))
 
-    game = Game()
+    levels = get_level_pack()
+    levels.load_all()
+    if level is None:
+        level = levels.names[0]
+
+    if seed is None and record:
+        seed = random.randrange(2 ** 31)  # a replay needs to know it
+
+    def factory(level):
+        # live games keep the enemy decisions within a time budget per tick
+        return new_game(level, TICK_TIME, seed, EnemyFractionAI.DECISION_BUDGET_US)
+
+    if record:
+        recording = Recording(level, seed, TICK_TIME)
+        preloader = None
+        # a replay must not depend on the speed of the machine: no time budget
+        game = new_game(level, TICK_TIME, seed, decision_budget_us=None)
 
+        def on_finished(events):
+            e = events[0]
+            recording.result = {'victory': e.victory, 'score': e.score, 'ticks': tick + 1}
+        game.events.subscribe(on_finished, GameFinished)
+    else:
+        recording = None
+        # restart and the next level are built in the background while we play
+        preloader = GamePreloader(factory)
+        game = preloader.take(level)
+        preloader.prepare(level, levels.next_name(level))
+    game.time_scale = time_scale
+
+    frame_gc = FrameGC() if frame_gc else None
+    if frame_gc:
+        frame_gc.start()
+    gc_monitor = GCMonitor().install() if gc_stats else None
+
+    def draw():
+        screen.fill(SCREEN_COLOR)
+        game.render(screen)
+        if config.DEBUG:
+            pygame.draw.circle(screen, (0, 255, 255), game.camera.to_screen(*game.my_tank.gun_point), 4, 1)
+        pygame.display.flip()
+
+    clock = pygame.time.Clock()
+    pilot = None
+    tick = 0
+    fire = switch = False  # until the next tick, there may be none in a slow motion frame
     running = True
     while running:
+        frame_start = time.perf_counter()
+        next_level = None
         for event in pygame.event.get():
             if event.type == QUIT:
                 running = False
             elif event.type == KEYDOWN:
                 if event.key == K_t:
-                    game.switch_my_tank()
+                    switch = True
                 elif event.key == K_ESCAPE:
                     running = False
                 elif event.key == K_SPACE:
-                    game.fire()
+                    fire = True
                 elif event.key == K_r:
-                    game = Game()
-
-        keys = pygame.key.get_pressed()
-
-        if keys[pygame.K_UP] or keys[pygame.K_w]:
-            game.my_tank_move_to_direction = Direction.UP
-        elif keys[pygame.K_DOWN] or keys[pygame.K_s]:
-            game.my_tank_move_to_direction = Direction.DOWN
-        elif keys[pygame.K_LEFT] or keys[pygame.K_a]:
-            game.my_tank_move_to_direction = Direction.LEFT
-        elif keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-            game.my_tank_move_to_direction = Direction.RIGHT
-        else:
-            game.my_tank_move_to_direction = None
-        
-        screen.fill((0,0,139))
-
-        game.update()
-        game.render(screen)
+                    next_level = level
+                elif event.key == K_n:
+                    next_level = levels.next_name(level)
+                elif event.key == K_p:
+                    autopilot = not autopilot
+                elif event.key in (K_LEFTBRACKET, K_RIGHTBRACKET):
+                    time_scale = game.pacer.slower() if event.key == K_LEFTBRACKET else game.pacer.faster()
+                    # the message is shown for the game time
+                    game.show_message(f'SPEED {time_scale}X' if time_scale else 'SPEED MAX', 1.5 * (time_scale or 16))
 
-        if DEBUG:
-            pygame.draw.circle(screen, (0, 255, 255), game.my_tank.gun_point, 4, 1)
+        if next_level:
+            if recording:
+                # only the first game is recorded
+                recording.save(record)
+                recording = None
+            level = next_level
+            if preloader is None:
+                preloader = GamePreloader(factory)
+            game = preloader.take(level)
+            preloader.prepare(level, levels.next_name(level))
+            game.time_scale = time_scale
+            if frame_gc:
+                frame_gc.start()  # freezes the new game, the old one is collected
 
-        pygame.display.flip()
+        ticks = 0
+        for _ in game.ticks():
+            if autopilot:
+                if pilot is None or pilot.game is not game:
+                    pilot = Autopilot(game)
+                inp = pilot(tick)._replace(switch=switch)
+            else:
+                inp = TickInput(read_move(pygame.key.get_pressed()), fire, switch)
+            fire = switch = False
+            if recording:
+                recording.record(tick, inp)
+            apply_input(game, inp)
+            game.update()
+            tick += 1
+            ticks += 1
+            if render_every_tick:
+                draw()
+
+        # the ticks between two frames are not drawn
+        if ticks and not render_every_tick:
+            draw()
+        if frame_gc:
+            frame_gc.end_frame(frame_start)
+        clock.tick(FRAME_RATE)
 
+    if gc_monitor:
+        gc_monitor.uninstall()
+        print('GC pauses:', gc_monitor.report())
+    if frame_gc:
+        frame_gc.stop()
+    if recording:
+        recording.save(record)
+    if preloader:
+        preloader.shutdown()
     pygame.quit()
+
+
+if __name__ == '__main__':
+    from cli import main
+    sys.exit(main(['play'] + sys.argv[1:]))
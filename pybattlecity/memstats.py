@@ -0,0 +1,244 @@
+"""
+Allocations and garbage collection.
+
+GCMonitor times every collection through gc.callbacks.
+FrameGC freezes the long-lived objects (level, sprites, scene) and runs the collector
+only at frame boundaries, when the frame left enough idle time.
+AllocationSampler measures allocations of every game phase with tracemalloc on every n-th tick.
+
+    python3 memstats.py --scenario tanks_200 --ticks 600
+    python3 memstats.py --scenario tanks_200 --frame-gc
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+from config import TICK_TIME
+
+
+class GCMonitor:
+    def __init__(self):
+        self.pauses = defaultdict(list)  # generation -> [seconds]
+        self.collected = 0
+        self._start = None
+
+    def _callback(self, phase, info):
+        if phase == 'start':
+            self._start = time.perf_counter()
+        elif self._start is not None:
+            self.pauses[info['generation']].append(time.perf_counter() - self._start)
+            self.collected += info['collected']
+            self._start = None
+
+    def install(self):
+        gc.callbacks.append(self._callback)
+        return self
+
+    def uninstall(self):
+        if self._callback in gc.callbacks:
+            gc.callbacks.remove(self._callback)
+
+    def report(self):
+        result = {}
+        for generation in sorted(self.pauses):
+            pauses = sorted(self.pauses[generation])
+            result[f'gen{generation}'] = {
+                'collections': len(pauses),
+                'total_ms': round(sum(pauses) * 1000, 3),
+                'max_ms': round(pauses[-1] * 1000, 3),
+                'p99_ms': round(pauses[min(len(pauses) - 1, int(len(pauses) * 0.99))] * 1000, 3),
+            }
+        result['collected'] = self.collected
+        return result
+
+
+class FrameGC:
+    """
+    Automatic collection is off while the game runs: the young generation (when it has MIN_COUNT objects)
+    is collected at the end of a frame which has MIN_IDLE seconds left, the middle one every OLD_EVERY
+    such collections.
+    The collector still runs if the young generation grows over FORCE_COUNT
+    (a stream of frames without idle time).
+    """
+    MIN_IDLE = 0.002
+    MIN_COUNT = 700  # the default threshold of the young generation
+    OLD_EVERY = 20
+    FORCE_COUNT = 20000
+
+    def __init__(self, frame_time=TICK_TIME):
+        self.frame_time = frame_time
+        self._young_collections = 0
+        self.active = False
+
+    def start(self):
+        """call when the long-lived objects are loaded (a new game was built)"""
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+        self.active = True
+
+    def stop(self):
+        gc.enable()
+        gc.unfreeze()
+        self.active = False
+
+    def end_frame(self, frame_start):
+        """
+        :param frame_start: time.perf_counter() at the start of the frame
+        """
+        count = gc.get_count()[0]
+        if count < self.MIN_COUNT:
+            return
+        idle = self.frame_time - (time.perf_counter() - frame_start)
+        if idle >= self.MIN_IDLE or count > self.FORCE_COUNT:
+            self._young_collections += 1
+            gc.collect(1 if self._young_collections % self.OLD_EVERY == 0 else 0)
+
+
+class AllocationSampler:
+    """
+    Wraps the game phases (Game.update_phases) and render. On every sample_every-th tick
+    the wrapped calls measure with tracemalloc:
+    net - memory still allocated after the call, peak - the most memory the call held at once
+    (temporary tuples, lists, generators show up here).
+    """
+    _filters = (tracemalloc.Filter(False, tracemalloc.__file__),)
+
+    def __init__(self, sample_every=10, top=10):
+        self.sample_every = sample_every
+        self.top = top
+        # the first sample is not the first tick: objects replaced right after tracemalloc.start()
+        # were not traced, their replacements would look like a leak
+        self.tick = 1
+        self.samples = 0
+        self.net = defaultdict(int)
+        self.peak = defaultdict(int)
+        self.sites = defaultdict(int)  # 'file:line' -> bytes still allocated after the sampled ticks
+
+    @property
+    def sampling(self):
+        return self.tick % self.sample_every == 0
+
+    def wrap(self, name, fn):
+        def sampled(*args, **kwargs):
+            if not self.sampling:
+                return fn(*args, **kwargs)
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                end, peak = tracemalloc.get_traced_memory()
+                self.net[name] += end - start
+                self.peak[name] += peak - start
+        return sampled
+
+    def instrument(self, game):
+        game.update_phases = [(name, self.wrap(name, phase)) for name, phase in game.update_phases]
+        game.render = self.wrap('render', game.render)
+
+    def run_tick(self, step):
+        """
+        :param step: function running one tick (update and render)
+        """
+        if not self.sampling:
+            step()
+        else:
+            before = tracemalloc.take_snapshot().filter_traces(self._filters)
+            step()
+            after = tracemalloc.take_snapshot().filter_traces(self._filters)
+            for diff in after.compare_to(before, 'lineno'):
+                if diff.size_diff > 0:
+                    frame = diff.traceback[0]
+                    self.sites[f'{frame.filename.rsplit("/", 1)[-1]}:{frame.lineno}'] += diff.size_diff
+            self.samples += 1
+        self.tick += 1
+
+    def report(self):
+        n = max(1, self.samples)
+        top_sites = sorted(self.sites.items(), key=lambda kv: -kv[1])[:self.top]
+        return {
+            'sampled_ticks': self.samples,
+            'per_tick': {
+                name: {'net_bytes': round(self.net[name] / n), 'peak_bytes': round(self.peak[name] / n)}
+                for name in self.net
+            },
+            'top_sites_bytes': {site: round(size / n) for site, size in top_sites},
+        }
+
+
+def parse_args(argv):
+    from bench import SCENARIOS, DEFAULT_SEED
+    parser = argparse.ArgumentParser(description='Allocations per tick and GC pauses')
+    parser.add_argument('--scenario', default='tanks_200', choices=sorted(SCENARIOS))
+    parser.add_argument('--ticks', type=int, default=600)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--sample-every', type=int, default=10, help='measure allocations on every n-th tick')
+    parser.add_argument('--no-alloc', action='store_true', help='only GC pauses, no tracemalloc')
+    parser.add_argument('--frame-gc', action='store_true', help='freeze and collect only at frame boundaries')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    from headless import init_headless
+    from bench import make_scenario
+    screen = init_headless()
+
+    game, on_tick = make_scenario(args.scenario, args.seed)
+    sampler = None if args.no_alloc else AllocationSampler(args.sample_every)
+    if sampler:
+        sampler.instrument(game)
+
+    def step():
+        if on_tick:
+            on_tick(game)
+        game.update()
+        game.render(screen)
+
+    frame_gc = FrameGC() if args.frame_gc else None
+    if frame_gc:
+        frame_gc.start()
+    monitor = GCMonitor().install()
+    if sampler:
+        tracemalloc.start()
+
+    frame_times = []
+    for _ in range(args.ticks):
+        t0 = time.perf_counter()
+        if sampler:
+            sampler.run_tick(step)
+        else:
+            step()
+        frame_times.append(time.perf_counter() - t0)
+        if frame_gc:
+            frame_gc.end_frame(t0)
+
+    if sampler:
+        tracemalloc.stop()
+    monitor.uninstall()
+    if frame_gc:
+        frame_gc.stop()
+
+    frame_times.sort()
+    print(f'{args.scenario}: {args.ticks} ticks, frame p50 {frame_times[len(frame_times) // 2] * 1000:.2f} ms, '
+          f'max {frame_times[-1] * 1000:.2f} ms')
+    for name, g in monitor.report().items():
+        print(f'    {name}: {g}')
+    if sampler:
+        r = sampler.report()
+        print(f'    allocations per tick ({r["sampled_ticks"]} sampled ticks):')
+        for name, a in r['per_tick'].items():
+            print(f'        {name:<20} net {a["net_bytes"]:>9} B   peak {a["peak_bytes"]:>9} B')
+        print('    top allocation sites (bytes left per tick):')
+        for site, size in r['top_sites_bytes'].items():
+            print(f'        {site:<28} {size:>9}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
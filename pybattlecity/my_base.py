@@ -1,4 +1,4 @@
-from config import ATLAS
+from config import ATLAS, CELL_SIZE
 from util import GameObject, point_in_rect
 
 
@@ -8,7 +8,7 @@ class MyBase(GameObject):
         self._normal_img = ATLAS().image_at(38, 4, 2, 2)
         self._broken_img = ATLAS().image_at(40, 4, 2, 2)
         self.broken = False
-        size = ATLAS().real_sprite_size * 2 - 1
+        size = CELL_SIZE * 2 - 1
         self.size = (size, size)
 
     def render(self, screen):
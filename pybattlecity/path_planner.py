@@ -0,0 +1,61 @@
+"""
+Path search for the enemy tanks (A* over the cells where a tank fits).
+
+The searches run inside TankAI.decide. In live games (main.py, server.py) EnemyFractionAI's
+decision budget bounds them per tick; headless.run_match and compare_ai.py run without
+a budget, so that a seed gives the same match. The terrain snapshot is built again only
+after the terrain changed.
+
+The search itself (a_star, TerrainSnapshot) is pytankbattle-main's path_search.py, where
+the hunter comes from; it is loaded from there, both programs share one implementation.
+"""
+import importlib.util
+import os
+import sys
+
+
+SEARCH_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                           'pytankbattle-main', 'pybattlecity', 'path_search.py')
+
+
+def _load_search():
+    # pytankbattle-main is not on the path, its modules have the same names as ours;
+    # path_search needs only util.Direction, which is the same in both
+    module = sys.modules.get('path_search')
+    if module is None:
+        spec = importlib.util.spec_from_file_location('path_search', SEARCH_FILE)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['path_search'] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+_search = _load_search()
+TerrainSnapshot = _search.TerrainSnapshot
+plan_path = _search.plan_path
+
+
+class PathPlanner:
+    def __init__(self, field_map):
+        """
+        :param field_map: field.TerrainMap
+        """
+        self.field_map = field_map
+        self._snapshot = None
+        self._version = None
+        self.searches = 0
+
+    @property
+    def snapshot(self) -> TerrainSnapshot:
+        if self._version != self.field_map.version:
+            self._snapshot = TerrainSnapshot.of_map(self.field_map)
+            self._version = self.field_map.version
+        return self._snapshot
+
+    def plan(self, start, goals):
+        """
+        :param start: (col, row) of the top-left cell of the tank
+        :param goals: [(col, row)] in the order of preference
+        """
+        self.searches += 1
+        return plan_path(self.snapshot, start, goals)
@@ -0,0 +1,70 @@
+"""
+Background preloading of games.
+
+Building a Game reads the level, slices sprites and pre-renders the terrain.
+GamePreloader does it on a worker thread while the current game runs,
+so a restart or a switch to the next level only takes the ready objects.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from config import ATLAS
+from util import Direction
+from tank import Tank
+from explosion import Explosion
+from bonus import BonusType
+from game import Game
+
+
+def warm_up_atlas():
+    """slice every sprite a game may need once, SpriteSheet.image_at keeps them"""
+    atlas = ATLAS()
+    for color in Tank.Color:
+        for tank_type in Tank.Type:
+            for d in Direction:
+                for state in Tank.POSSIBLE_MOVE_STATES:
+                    location = Tank.get_sprite_location(color, tank_type, d, state)
+                    atlas.image_at(*location, auto_crop=True, square=False)
+    for x, y, w, h in Explosion.SPRITE_DESCRIPTORS:
+        atlas.image_at(x, y, w, h)
+    for bonus_type in BonusType:
+        atlas.image_at(*bonus_type.value, 2, 2)
+    for x in range(40, 44):
+        atlas.image_at(x, 12, 1, 2)  # projectiles
+
+
+class GamePreloader:
+    def __init__(self, factory=Game):
+        """
+        :param factory: level name -> new Game
+        """
+        self.factory = factory
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='preload')
+        self._pending = {}  # level name -> Future of a Game
+        self._executor.submit(warm_up_atlas)
+
+    def _build(self, level):
+        game = self.factory(level)
+        game.field.prerender()
+        return game
+
+    def prepare(self, *levels):
+        """start building games for these levels; games prepared for other levels are dropped"""
+        for name in list(self._pending):
+            if name not in levels:
+                self._pending.pop(name).cancel()
+        for name in levels:
+            if name not in self._pending:
+                self._pending[name] = self._executor.submit(self._build, name)
+
+    def take(self, level) -> Game:
+        """
+        :return: the game prepared for the level, it is built right now if it was not requested
+        """
+        future = self._pending.pop(level, None)
+        game = future.result() if future else self._build(level)
+        # the game was built on the worker thread, timers created from now on must use its clock
+        game.scheduler.activate()
+        return game
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -17,6 +17,7 @@ class Projectile(GameObject):
         super().__init__()
 
         self.sender = sender
+        self.clock = Scheduler.current()  # its tick_scale is the number of steps per update
         self.position = x, y
         self.direction = d
         self.power = power
@@ -28,11 +29,6 @@ class Projectile(GameObject):
             (1, 0): ATLAS().image_at(43, 12, 1, 2)
         }[d.vector]
 
-    @property
-    def on_screen(self):
-        x, y = self.position
-        return 0 < x < GAME_WIDTH and 0 < y < GAME_HEIGHT
-
     @property
     def bounding_rect(self):
         x, y = self.position
@@ -41,7 +37,7 @@ class Projectile(GameObject):
             w, h = h, w
         return x - w, y - h, w * 2, h * 2
 
-    def render(self, screen: pygame.Surface):
+    def render(self, screen):
         x, y = self.position
         sbx, sby = self.direction.vector
         sbx *= self.SHIFT_BACK
@@ -53,19 +49,21 @@ class Projectile(GameObject):
             # pygame.draw.rect(screen, (255, 0, 0), self.bounding_rect)
             # for x, y in self.split_for_aim():
             #     pygame.draw.circle(screen, (0, 100, 0), (x, y), 5)
-            pygame.draw.circle(screen, (0, 200, 0), (x, y), 4)
+            pygame.draw.circle(screen.surface, (0, 200, 0), screen.to_screen(x, y), 4)
 
-        if not self.on_screen:
-            self.remove_from_parent()
+    @property
+    def steps(self):
+        return self.clock.tick_scale
 
-    def update(self):
+    def position_after(self, steps):
+        x, y = self.position
         vx, vy = self.direction.vector
-        self.move(vx * self.SPEED, vy * self.SPEED)
+        return x + vx * self.SPEED * steps, y + vy * self.SPEED * steps
 
     def split_for_aim(self):
         """разбивает снаряд на 3 виртуальных для равномерности разрушения"""
         x, y = self.position
-        distance = int(ATLAS().real_sprite_size / 1.4)
+        distance = int(CELL_SIZE / 1.4)
         vx, vy = self.direction.vector
         px, py = (vy * distance), (-vx * distance)
 
@@ -0,0 +1,78 @@
+"""
+Recorded player input.
+
+A game started with the same level, seed and fixed step plays the same way
+when it gets the same input on the same ticks, so a replay stores only
+the ticks where the input changed.
+"""
+import json
+from collections import namedtuple
+
+from util import Direction
+
+
+REPLAY_VERSION = 1
+
+TickInput = namedtuple('TickInput', ('move', 'fire', 'switch'))
+IDLE = TickInput(None, False, False)
+
+
+def apply_input(game, inp: TickInput):
+    game.my_tank_move_to_direction = inp.move
+    if inp.fire:
+        game.fire()
+    if inp.switch:
+        game.switch_my_tank()
+
+
+class Recording:
+    def __init__(self, level, seed, fixed_step, changes=None, result=None):
+        self.level = level
+        self.seed = seed
+        self.fixed_step = fixed_step
+        self.changes = changes if changes is not None else []  # [(tick, TickInput)]
+        self.result = result  # {'victory':, 'score':, 'ticks':} when the game was finished
+        self._last = IDLE
+
+    def record(self, tick, inp: TickInput):
+        if inp != self._last:
+            self.changes.append((tick, inp))
+            self._last = inp
+
+    def inputs(self):
+        """:return: tick -> TickInput function for headless.run_match"""
+        changes = iter(self.changes)
+        next_change = next(changes, None)
+        current = IDLE
+
+        def input_at(tick):
+            nonlocal next_change, current
+            while next_change is not None and next_change[0] <= tick:
+                current = next_change[1]
+                next_change = next(changes, None)
+            return current
+
+        return input_at
+
+    def save(self, filename):
+        data = {
+            'version': REPLAY_VERSION,
+            'level': self.level,
+            'seed': self.seed,
+            'fixed_step': self.fixed_step,
+            'result': self.result,
+            'inputs': [[tick, inp.move.name if inp.move else None, inp.fire, inp.switch]
+                       for tick, inp in self.changes],
+        }
+        with open(filename, 'w') as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename) as f:
+            data = json.load(f)
+        if data.get('version') != REPLAY_VERSION:
+            raise ValueError(f'{filename}: unsupported replay version {data.get("version")}')
+        changes = [(tick, TickInput(Direction[move] if move else None, fire, switch))
+                   for tick, move, fire, switch in data['inputs']]
+        return cls(data['level'], data['seed'], data['fixed_step'], changes, data.get('result'))
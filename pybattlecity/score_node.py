@@ -2,6 +2,8 @@ from util import GameObject, ArmedTimer
 from config import *
 import pygame
 from collections import namedtuple
+from functools import partial
+import itertools
 
 
 ScoreNode = namedtuple('ScoreNode', ('x', 'y', 'sprite', 'timer'))
@@ -12,11 +14,14 @@ class ScoreLayer(GameObject):
 
     def __init__(self):
         super().__init__()
-        self._entities = []
+        # key -> ScoreNode in the order of adding; a node is removed by its timer (the scheduler heap),
+        # so a tick does nothing for the nodes which stay
+        self._entities = {}
+        self._keys = itertools.count()
 
         a = ATLAS()
 
-        self._dx = a.real_sprite_size
+        self._dx = CELL_SIZE
 
         def score_sprite(x, y):
             return a.image_at(x, y, 2, 2)
@@ -37,18 +42,15 @@ class ScoreLayer(GameObject):
         x -= self._dx
         y += self._dx
 
-        self._entities.append(ScoreNode(
+        key = next(self._keys)
+        self._entities[key] = ScoreNode(
             x, y,
             self._sprites[score],
-            ArmedTimer(self.SCORE_STAY_TIME)
-        ))
-
-    def render(self, screen: pygame.Surface):
-        for x, y, sprite, _ in self._entities:
-            screen.blit(sprite, (x, y))
-
-    def update(self):
-        def _still_ticking(e: ScoreNode):
-            e.timer.tick()
-            return not e.timer.done
-        self._entities = [e for e in self._entities if _still_ticking(e)]
+            ArmedTimer(self.SCORE_STAY_TIME, callback=partial(self._entities.pop, key, None))
+        )
+
+    def render(self, screen):
+        size = self._dx * 2
+        for x, y, sprite, _ in self._entities.values():
+            if screen.sees((x, y, size, size)):
+                screen.blit(sprite, (x, y))
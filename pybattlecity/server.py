@@ -0,0 +1,447 @@
+"""
+Game server: many independent matches in one process.
+
+Every room is a Game with its own seed, random numbers and scheduler, nothing is rendered.
+One asyncio task keeps a heap of the rooms by their next tick and updates the ones which
+are due on the fixed cadence (TICK_TIME * tick scale of the real time), like util.Scheduler
+does with timers. The rooms share only the sprite atlas, whose cached surfaces are never changed.
+
+Clients talk JSON lines over TCP, one object per line:
+    -> {"op": "create", "level": "level1", "seed": 1, "enemy_ai": "walker"}
+    <- {"op": "created", "room": 1}                    the creator joins the room
+    -> {"op": "join", "room": 1}                       another client watches or plays too
+    -> {"op": "input", "room": 1, "move": "up", "fire": true}
+                                                       move: up/down/left/right or null, held until the next input
+    <- {"op": "state", "room": 1, "tick": 120, "score": 0, "base": true, "terrain": 3, "over": null,
+        "tanks": [[x, y, "U", "p"], ...], "shots": [[x, y], ...], "bonuses": [[x, y, "CASK"], ...]}
+                                                       every few ticks; tanks: direction, p(layer)/e(nemy)/s(pawning)
+    -> {"op": "map", "room": 1}                        the cells when "terrain" (their version) changed
+    <- {"op": "map", "room": 1, "terrain": 3, "rows": ["1177...", ...]}   values of terrain.CellType
+    -> {"op": "stats"}                                 tick time and lateness of every room
+    -> {"op": "leave", "room": 1}                      a room is closed when its last client leaves
+    <- {"op": "error", "message": "..."}               a bad request, e.g. a level or enemy_ai which doesn't exist
+
+    python3 server.py --port 7001
+    python3 server.py --loadtest --rooms 300 --seconds 10 --tick-scale 3
+"""
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import random
+import sys
+import time
+from collections import deque
+
+from config import TICK_TIME
+
+
+DEFAULT_PORT = 7001
+STATE_EVERY = 3  # ticks between two states sent to the clients
+STATS_WINDOW = 600  # recent ticks of a room in the stats
+MAX_CLIENT_BUFFER = 256 * 1024  # bytes; a client which reads slower skips states
+MAX_BEHIND = 0.25  # seconds; a room further behind its cadence skips the ticks instead of catching up
+MAX_BATCH = 0.005  # seconds of ticks before the clients are served
+
+MOVES = {'up': 'UP', 'down': 'DOWN', 'left': 'LEFT', 'right': 'RIGHT'}
+
+
+def encode(message) -> bytes:
+    return (json.dumps(message, separators=(',', ':')) + '\n').encode()
+
+
+class Room:
+    def __init__(self, room_id, level='level1', seed=None, enemy_ai='walker', tick_scale=1):
+        from game import Game
+        from events import GameFinished
+        self.id = room_id
+        self.game = Game(level, fixed_step=TICK_TIME, seed=seed, enemy_ai=enemy_ai, tick_scale=tick_scale)
+        self.game.events.subscribe(self._on_finished, GameFinished)
+        self.result = None  # GameFinished
+        self.tick = 0
+        self.move = None  # util.Direction, held
+        self.fire = False  # until the next tick takes it
+        self.clients = set()  # asyncio.StreamWriter
+        self.closed = False
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.tick_ns = deque(maxlen=STATS_WINDOW)  # update() of the game
+        self.late_s = deque(maxlen=STATS_WINDOW)  # behind the cadence when the tick started
+        self.skipped_ticks = 0
+        self.skipped_states = 0  # not sent to slow clients
+
+    def _on_finished(self, events):
+        self.result = events[0]
+
+    @property
+    def over(self):
+        return self.result is not None
+
+    def step(self):
+        from replay import TickInput, apply_input
+        game = self.game
+        # objects created by the input (projectiles) take the clock of the current scheduler
+        game.scheduler.activate()
+        t0 = time.perf_counter_ns()
+        apply_input(game, TickInput(self.move, self.fire, False))
+        self.fire = False
+        game.update()
+        self.tick_ns.append(time.perf_counter_ns() - t0)
+        self.tick += 1
+
+    def state(self):
+        game = self.game
+        tanks = []
+        for t in game.tanks:
+            x, y = t.position
+            kind = 's' if t.is_spawning else 'p' if t is game.my_tank else 'e'
+            tanks.append([int(x), int(y), t.direction.name[0], kind])
+        over = None
+        if self.result is not None:
+            over = 'win' if self.result.victory else 'lose'
+        return {
+            'op': 'state', 'room': self.id, 'tick': self.tick, 'score': game.score,
+            'base': not game.my_base.broken, 'terrain': game.field.map.version, 'over': over,
+            'tanks': tanks,
+            'shots': [[int(p.position[0]), int(p.position[1])] for p in game.projectiles],
+            'bonuses': [[int(b.position[0]), int(b.position[1]), b.type.name] for b in game.bonuses],
+        }
+
+    def map(self):
+        field_map = self.game.field.map
+        rows = [''.join(str(field_map.get_cell_by_col_row(col, row).value) for col in range(field_map.width))
+                for row in range(field_map.height)]
+        return {'op': 'map', 'room': self.id, 'terrain': field_map.version, 'rows': rows}
+
+    def stats(self):
+        from stress import percentile
+        tick_us = [ns / 1000 for ns in self.tick_ns]
+        late_ms = [s * 1000 for s in self.late_s]
+        return {
+            'room': self.id,
+            'ticks': self.tick,
+            'tick_us': round(sum(tick_us) / len(tick_us), 1) if tick_us else 0.0,
+            'tick_p95_us': round(percentile(tick_us, 0.95), 1),
+            'tick_max_us': round(max(tick_us, default=0.0), 1),
+            'late_ms': round(sum(late_ms) / len(late_ms), 2) if late_ms else 0.0,
+            'late_p95_ms': round(percentile(late_ms, 0.95), 2),
+            'skipped_ticks': self.skipped_ticks,
+            'skipped_states': self.skipped_states,
+            'clients': len(self.clients),
+            'over': self.over,
+        }
+
+
+class GameServer:
+    def __init__(self, tick_scale=1, state_every=STATE_EVERY):
+        """
+        :param tick_scale: fixed steps per tick (util.Scheduler), the rooms tick this many times less often
+        """
+        self.tick_scale = tick_scale
+        self.interval = TICK_TIME * tick_scale
+        self.state_every = state_every
+        self.rooms = {}
+        self._ids = itertools.count(1)
+        self._due = []  # (deadline, room id, room)
+        self._wake = asyncio.Event()
+        self._ticker = None
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        self._ticker = asyncio.get_running_loop().create_task(self.run())
+        self._server = await asyncio.start_server(self.handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        for room in list(self.rooms.values()):
+            self.close_room(room)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._ticker is not None:
+            self._ticker.cancel()
+
+    def create_room(self, level='level1', seed=None, enemy_ai='walker'):
+        from levels import get_level_pack
+        from ai import TANK_AIS
+        # the names come from the clients, only the known ones reach the file system and the Game
+        if level not in get_level_pack().names:
+            raise ValueError(f'unknown level {level}')
+        if enemy_ai not in TANK_AIS:
+            raise ValueError(f'unknown enemy_ai {enemy_ai}')
+        room = Room(next(self._ids), level, seed, enemy_ai, self.tick_scale)
+        self.rooms[room.id] = room
+        # the rooms are spread over the interval, they don't all tick at once
+        deadline = asyncio.get_running_loop().time() + (room.id * 0.618) % 1 * self.interval
+        heapq.heappush(self._due, (deadline, room.id, room))
+        self._wake.set()
+        return room
+
+    def close_room(self, room):
+        self.rooms.pop(room.id, None)
+        room.closed = True  # dropped from the heap when it is due
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        due, interval = self._due, self.interval
+        while True:
+            if not due:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            await asyncio.sleep(max(0.0, due[0][0] - loop.time()))
+            batch_end = loop.time() + MAX_BATCH
+            while due and due[0][0] <= loop.time() < batch_end:
+                deadline, room_id, room = heapq.heappop(due)
+                if room.closed:
+                    continue
+                late = loop.time() - deadline
+                if late > MAX_BEHIND:
+                    skipped = int(late / interval)
+                    room.skipped_ticks += skipped
+                    deadline += skipped * interval
+                    late -= skipped * interval
+                room.late_s.append(late)
+                room.step()
+                if room.tick % self.state_every == 0 or room.over:
+                    self.broadcast(room, encode(room.state()))
+                if not room.over:
+                    heapq.heappush(due, (deadline + interval, room_id, room))
+
+    def reset_stats(self):
+        for room in self.rooms.values():
+            room.reset_stats()
+
+    def broadcast(self, room, data):
+        for writer in room.clients:
+            if writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+                room.skipped_states += 1
+            else:
+                writer.write(data)
+
+    def room(self, message):
+        room = self.rooms.get(message['room'])
+        if room is None:
+            raise ValueError(f'no room {message["room"]}')
+        return room
+
+    def dispatch(self, message, writer, joined):
+        """:return: the reply or None"""
+        op = message['op']
+        if op == 'input':
+            room = self.room(message)
+            move = message.get('move')
+            if move is not None and move not in MOVES:
+                raise ValueError(f'bad move {move}')
+            from util import Direction
+            room.move = Direction[MOVES[move]] if move else None
+            room.fire = room.fire or bool(message.get('fire'))
+            return None
+        if op == 'create':
+            room = self.create_room(message.get('level', 'level1'), message.get('seed'),
+                                    message.get('enemy_ai', 'walker'))
+            room.clients.add(writer)
+            joined.add(room)
+            return {'op': 'created', 'room': room.id}
+        if op == 'join':
+            room = self.room(message)
+            room.clients.add(writer)
+            joined.add(room)
+            return {'op': 'joined', 'room': room.id}
+        if op == 'leave':
+            room = self.room(message)
+            self.leave(room, writer)
+            joined.discard(room)
+            return {'op': 'left', 'room': room.id}
+        if op == 'map':
+            return self.room(message).map()
+        if op == 'stats':
+            return {'op': 'stats', 'tick_scale': self.tick_scale,
+                    'rooms': [room.stats() for room in self.rooms.values()]}
+        raise ValueError(f'unknown op {op}')
+
+    def leave(self, room, writer):
+        room.clients.discard(writer)
+        if not room.clients:
+            self.close_room(room)
+
+    async def handle(self, reader, writer):
+        joined = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = self.dispatch(json.loads(line), writer, joined)
+                except KeyError as e:
+                    reply = {'op': 'error', 'message': f'no {e.args[0]} in the message'}
+                except (ValueError, TypeError) as e:
+                    reply = {'op': 'error', 'message': str(e)}
+                if reply is not None:
+                    writer.write(encode(reply))
+        except ConnectionError:
+            pass
+        finally:
+            for room in joined:
+                self.leave(room, writer)
+            writer.close()
+
+
+class Client:
+    """Loopback test client: plays one room with random inputs of its own seed."""
+    INPUT_INTERVAL = 0.25  # seconds
+
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.seed = seed
+        self.room = None
+        self.states = 0
+        self.bytes = 0
+        self.last_state = None
+        self._reader = self._writer = None
+
+    async def connect(self, host, port):
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+
+    async def request(self, message):
+        self._writer.write(encode(message))
+        while True:
+            reply = await self.read()
+            if reply['op'] != 'state':
+                return reply
+
+    async def read(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError('the server closed the connection')
+        message = json.loads(line)
+        if message['op'] == 'state':
+            self.states += 1
+            self.bytes += len(line)
+            self.last_state = message
+        return message
+
+    async def create(self, level):
+        self.room = (await self.request({'op': 'create', 'level': level, 'seed': self.seed}))['room']
+
+    async def play(self, seconds):
+        end = time.perf_counter() + seconds
+        reading = asyncio.get_running_loop().create_task(self._read_states())
+        try:
+            while time.perf_counter() < end and not (self.last_state and self.last_state['over']):
+                move = self.random.choice((None, *MOVES))
+                self._writer.write(encode({'op': 'input', 'room': self.room, 'move': move,
+                                           'fire': self.random.random() < 0.5}))
+                await asyncio.sleep(self.INPUT_INTERVAL)
+        finally:
+            reading.cancel()
+
+    async def _read_states(self):
+        while True:
+            await self.read()
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def loadtest(rooms, seconds, level='level1', tick_scale=1, state_every=STATE_EVERY, first_seed=0,
+                   warmup=1.0):
+    """
+    Server and clients in one event loop (the clients take some of the CPU too).
+    The stats are taken after warmup seconds of play, when all the rooms are created.
+    :return: summary of the rooms
+    """
+    from stress import percentile
+    server = GameServer(tick_scale, state_every)
+    port = await server.start(port=0)
+    clients = [Client(first_seed + i) for i in range(rooms)]
+    for client in clients:
+        await client.connect('127.0.0.1', port)
+        await client.create(level)
+
+    playing = asyncio.gather(*(client.play(warmup + seconds) for client in clients))
+    await asyncio.sleep(warmup)
+    server.reset_stats()
+    start_ticks = {room.id: room.tick for room in server.rooms.values()}
+    t0 = time.perf_counter()
+    await playing
+    elapsed = time.perf_counter() - t0
+
+    stats = [room.stats() for room in server.rooms.values()]
+    ticks = sum(room.tick - start_ticks.get(room.id, 0) for room in server.rooms.values())
+    for client in clients:
+        await client.close()
+    await server.close()
+
+    expected = len(stats) * elapsed / server.interval
+    return {
+        'rooms': rooms,
+        'live_rooms': len(stats),
+        'seconds': round(elapsed, 2),
+        'ticks_per_s': round(ticks / elapsed, 1),
+        'cadence': round(ticks / expected, 3) if expected else 0.0,
+        'tick_us': round(sum(s['tick_us'] for s in stats) / len(stats), 1) if stats else 0.0,
+        'tick_p95_us': round(percentile([s['tick_p95_us'] for s in stats], 0.95), 1),
+        'late_p95_ms': round(percentile([s['late_p95_ms'] for s in stats], 0.95), 2),
+        'skipped_ticks': sum(s['skipped_ticks'] for s in stats),
+        'states': sum(c.states for c in clients),
+        'state_bytes': round(sum(c.bytes for c in clients) / max(1, sum(c.states for c in clients))),
+    }
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Game server: many rooms in one process')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--tick-scale', type=int, default=1,
+                        help='fixed steps per tick, the rooms tick this many times less often')
+    parser.add_argument('--state-every', type=int, default=STATE_EVERY, help='ticks between two states sent')
+    parser.add_argument('--loadtest', action='store_true', help='run loopback clients against a server in this process')
+    parser.add_argument('--rooms', type=int, default=100, help='with --loadtest')
+    parser.add_argument('--seconds', type=float, default=10.0, help='with --loadtest')
+    parser.add_argument('--level', default='level1', help='with --loadtest')
+    parser.add_argument('--output', help='with --loadtest: write the summary to this JSON file')
+    return parser.parse_args(argv)
+
+
+async def serve(args):
+    server = GameServer(args.tick_scale, args.state_every)
+    port = await server.start(args.host, args.port)
+    print(f'serving on {args.host}:{port}, a tick every {server.interval * 1000:.1f} ms')
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    from headless import init_headless
+    args = parse_args(argv)
+    init_headless()  # the sprites of the tanks are loaded even when nothing is drawn
+
+    if not args.loadtest:
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    r = asyncio.run(loadtest(args.rooms, args.seconds, args.level, args.tick_scale, args.state_every))
+    print(f'{r["rooms"]} rooms ({r["live_rooms"]} live at the end) for {r["seconds"]} s, tick scale {args.tick_scale}')
+    print(f'ticks {r["ticks_per_s"]:.0f}/s, {r["cadence"] * 100:.1f}% of the cadence, '
+          f'{r["skipped_ticks"]} skipped')
+    print(f'tick {r["tick_us"]:.0f} us, p95 {r["tick_p95_us"]:.0f} us; late p95 {r["late_p95_ms"]:.2f} ms')
+    print(f'{r["states"]} states sent, {r["state_bytes"]} bytes each')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'result': r}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Stress mode: ramps the number of enemies alive up to hundreds and reports
+how the simulation and the rendering scale, per game phase.
+
+    python3 stress.py --max-enemies 600 --step 100
+    python3 stress.py --window               # in a real window
+    python3 stress.py --output stress.json
+"""
+import argparse
+import json
+import sys
+import time
+
+from headless import init_headless
+import pygame
+from game import Game
+from levels import get_level_pack
+from bench import CallTimer
+from config import TICK_TIME, GAME_WIDTH, GAME_HEIGHT, SCREEN_COLOR
+
+
+DEFAULT_MAX_ENEMIES = 600
+DEFAULT_STEP = 100
+DEFAULT_TICKS = 120  # measured ticks per step
+DEFAULT_FILL_TICKS = 1200  # max ticks to spawn the enemies of a step
+DEFAULT_SPAWN_POINTS = 64
+DEFAULT_BURST = 32
+SPAWN_INTERVAL = 0.05
+
+
+def make_game(level, tiled, spawn_points, burst, seed):
+    level = get_level_pack().get(level)
+    if tiled > 1:
+        level = level.tiled(tiled, tiled)
+    game = Game(level, fixed_step=TICK_TIME, seed=seed, decision_budget_us=None)
+    # keep the match going: no game over, no victory
+    game.my_base.check_hit = lambda x, y: False
+
+    ai = game.ai
+    ai.total_to_spawn = None
+    ai.spawn_burst = burst
+    ai.spawn_timer.delay = SPAWN_INTERVAL
+
+    # spawn points spread over the map, but not right at the base
+    positions = [p for p in game.field.tank_positions(step=4) if p[1] < game.field.height - 6]
+    stride = max(1, len(positions) // spawn_points)
+    ai.set_spawn_points(positions[::stride][:spawn_points])
+    return game
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+class StressRun:
+    def __init__(self, game: Game, screen=None, window=False):
+        self.game = game
+        self.screen = screen
+        self.window = window
+        self.call_timer = CallTimer()
+        self.call_timer.instrument(game)
+        self.running = True
+
+    def tick(self):
+        game = self.game
+        t0 = time.perf_counter()
+        game.update()
+        t1 = time.perf_counter()
+        if self.screen is not None:
+            self.screen.fill(SCREEN_COLOR)
+            game.render(self.screen)
+        t2 = time.perf_counter()
+        if self.window:
+            pygame.display.flip()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.running = False
+        return t1 - t0, t2 - t1
+
+    def fill(self, target, max_ticks):
+        ai = self.game.ai
+        ai.max_enemies = target
+        for _ in range(max_ticks):
+            if len(ai.all_enemies) >= target or not self.running:
+                break
+            self.tick()
+
+    def measure(self, ticks):
+        self.call_timer.seconds.clear()
+        self.call_timer.calls.clear()
+        sim, render = [], []
+        for _ in range(ticks):
+            if not self.running:
+                break
+            s, r = self.tick()
+            sim.append(s * 1000)
+            render.append(r * 1000)
+        n = max(1, len(sim))
+        return {
+            'enemies': len(self.game.ai.all_enemies),
+            'objects': self.game.scene.total_children - 1,
+            'sim_ms': round(sum(sim) / n, 3),
+            'sim_p95_ms': round(percentile(sim, 0.95), 3),
+            'render_ms': round(sum(render) / n, 3),
+            'render_p95_ms': round(percentile(render, 0.95), 3),
+            'phases': {name: p['ms_per_tick'] for name, p in self.call_timer.report(n).items()},
+        }
+
+
+def print_step(r):
+    phases = '  '.join(f'{name.replace("phase.", "")} {ms:.2f}' for name, ms in r['phases'].items())
+    print(f'{r["target"]:>7}{r["enemies"]:>8}{r["objects"]:>8}'
+          f'{r["sim_ms"]:>9.2f}{r["sim_p95_ms"]:>9.2f}{r["render_ms"]:>9.2f}{r["render_p95_ms"]:>9.2f}   {phases}')
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Stress mode: hundreds of enemies at once')
+    parser.add_argument('--level', default='level1')
+    parser.add_argument('--tiled', type=int, default=4, help='play on the level repeated N x N times')
+    parser.add_argument('--max-enemies', type=int, default=DEFAULT_MAX_ENEMIES)
+    parser.add_argument('--step', type=int, default=DEFAULT_STEP, help='enemies added per step')
+    parser.add_argument('--ticks', type=int, default=DEFAULT_TICKS, help='measured ticks per step')
+    parser.add_argument('--fill-ticks', type=int, default=DEFAULT_FILL_TICKS,
+                        help='max ticks to spawn the enemies of a step')
+    parser.add_argument('--spawn-points', type=int, default=DEFAULT_SPAWN_POINTS)
+    parser.add_argument('--burst', type=int, default=DEFAULT_BURST, help='tanks spawned at once')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--window', action='store_true', help='show the game in a window')
+    parser.add_argument('--no-render', action='store_true', help='simulation only (headless)')
+    parser.add_argument('--output', help='write results to this JSON file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.window:
+        pygame.init()
+        screen = pygame.display.set_mode((GAME_WIDTH, GAME_HEIGHT))
+    else:
+        screen = init_headless()
+        if args.no_render:
+            screen = None
+
+    game = make_game(args.level, args.tiled, args.spawn_points, args.burst, args.seed)
+    run = StressRun(game, screen, args.window)
+
+    print(f'{"target":>7}{"alive":>8}{"objects":>8}{"sim ms":>9}{"p95":>9}{"render":>9}{"p95":>9}   phases, ms/tick')
+    results = []
+    for target in range(args.step, args.max_enemies + 1, args.step):
+        run.fill(target, args.fill_ticks)
+        if not run.running:
+            break
+        r = run.measure(args.ticks)
+        r['target'] = target
+        results.append(r)
+        print_step(r)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'steps': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -47,6 +47,8 @@ class Tank(GameObject):
 
     SHIELD_TIME = 10
 
+    _sprite_cache = {}  # (color, type) -> {(direction, move state): sprite}
+
     FRIEND = 'friend'
     ENEMY = 'enemy'
 
@@ -74,13 +76,19 @@ class Tank(GameObject):
         self.want_to_fire = True
 
     def _update_sprites(self):
-        atlas = ATLAS()
-        sprite_locations = {(d, s): self.get_sprite_location(self.color, self.tank_type, d, s)
-                            for d in Direction
-                            for s in self.POSSIBLE_MOVE_STATES}
-
-        self.sprites = {key: atlas.image_at(*location, auto_crop=True, square=False)
-                        for key, location in sprite_locations.items()}
+        # bonus tanks switch the color every few frames: the sprites of a color and type are built once
+        key = (self.color, self.tank_type)
+        sprites = self._sprite_cache.get(key)
+        if sprites is None:
+            atlas = ATLAS()
+            sprite_locations = {(d, s): self.get_sprite_location(self.color, self.tank_type, d, s)
+                                for d in Direction
+                                for s in self.POSSIBLE_MOVE_STATES}
+
+            sprites = {key: atlas.image_at(*location, auto_crop=True, square=False)
+                       for key, location in sprite_locations.items()}
+            self._sprite_cache[key] = sprites
+        self.sprites = sprites
 
     @property
     def color(self):
@@ -96,6 +104,7 @@ class Tank(GameObject):
 
         self.fraction = fraction
         self.speed = self.SPEED_NORMAL
+        self.clock = Scheduler.current()  # its tick_scale multiplies the moves
         self._direction = Direction.UP
         self._tank_type = tank_type
         self._color = color
@@ -118,7 +127,7 @@ class Tank(GameObject):
 
         atlas = ATLAS()
 
-        sz = atlas.real_sprite_size * 2 - 2
+        sz = CELL_SIZE * 2 - 2
         self.size = sz, sz
 
         if DEBUG:
@@ -127,7 +136,7 @@ class Tank(GameObject):
                 print(k, w, h)
 
         self._shielded = False
-        self._shield_timer = Timer(self.SHIELD_TIME)
+        self._shield_timer = Timer(self.SHIELD_TIME, callback=self._on_shield_timeout)
         self._shield_animator = Animator(delay=0.04, max_states=2)
         self._shield_sprites = (
             atlas.image_at(32, 18, 2, 2),
@@ -139,7 +148,7 @@ class Tank(GameObject):
         ]
         self._spawn_animator = Animator(delay=0.1, max_states=len(self._spawn_sprites))
 
-        self.fire_timer = Timer(fire_delay, paused=True)
+        self.fire_timer = ArmedTimer(fire_delay)
 
     @property
     def shielded(self):
@@ -149,11 +158,13 @@ class Tank(GameObject):
     def shielded(self, v):
         self._shielded = v
         if self._shielded:
-            self._shield_timer = Timer(self.SHIELD_TIME)
             self._shield_timer.start()
         else:
             self._shield_timer.stop()
 
+    def _on_shield_timeout(self):
+        self._shielded = False
+
     @property
     def direction(self):
         return self._direction
@@ -162,7 +173,7 @@ class Tank(GameObject):
     def direction(self, new_dir: Direction):
         self._direction = new_dir
 
-        discrete_step = ATLAS().real_sprite_size // 2
+        discrete_step = CELL_SIZE // 2
         x, y = self.position
         vx, vy = self._direction.vector
         if vx != 0:
@@ -174,7 +185,7 @@ class Tank(GameObject):
         self.finish_position = x, y
 
     def try_fire(self):
-        if self.fire_timer():
+        if self.fire_timer.tick():
             self.fire_timer.start()
             return True
         return False
@@ -189,8 +200,8 @@ class Tank(GameObject):
         x, y = self.position
 
         # tank sprite is trimmed (it is smaller than 2x2 sprite)
-        ctx = sprite.get_width() // 2
-        cty = sprite.get_height() // 2
+        ctx = sprite.get_width() * screen.scale // 2
+        cty = sprite.get_height() * screen.scale // 2
 
         if not self.is_spawning:
             screen.blit(sprite, (x - ctx, y - cty))
@@ -204,13 +215,11 @@ class Tank(GameObject):
             self.color = Tank.Color.PURPLE if state == 0 else Tank.Color.PLAIN
 
         # it is size of a half of full 2x2 sprite, effects have full size unlike tanks
-        half_full_size = ATLAS().real_sprite_size
+        half_full_size = CELL_SIZE
 
         if not self._shield_timer.tick():
             shield_sprite = self._shield_sprites[self._shield_animator()]
             screen.blit(shield_sprite, (x - half_full_size, y - half_full_size))
-        else:
-            self._shielded = False
 
         if self.is_spawning:
             spawn_sprite = self._spawn_sprites[self._spawn_animator()]
@@ -262,7 +271,8 @@ class Tank(GameObject):
         self.moving = True
         self.direction = direction
         vx, vy = direction.vector
-        self.move(vx * self.speed, vy * self.speed)
+        distance = self.speed * self.clock.tick_scale
+        self.move(vx * distance, vy * distance)
 
     def remember_position(self):
         self.old_position = tuple(self.position)
@@ -270,11 +280,18 @@ class Tank(GameObject):
     def undo_move(self):
         self.position = tuple(self.old_position)
 
+    def step_back(self, steps=1):
+        """go back by steps base steps (speed) of the last move"""
+        x, y = self.position
+        vx, vy = self.direction.vector
+        distance = self.speed * steps
+        self.position = x - vx * distance, y - vy * distance
+
     def stop(self):
         self.moving = False
 
     def align(self):
-        discrete_step = ATLAS().real_sprite_size // 2
+        discrete_step = CELL_SIZE // 2
         x, y = self.position
         vx, vy = self.direction.vector
         if vx != 0:
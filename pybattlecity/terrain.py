@@ -0,0 +1,116 @@
+from enum import Enum, auto
+
+
+class CellType(Enum):
+    FREE = auto()
+    BRICK = auto()
+    BRICK_RIGHT = auto()
+    BRICK_BOTTOM = auto()
+    BRICK_LEFT = auto()
+    BRICK_TOP = auto()
+    CONCRETE = auto()
+    GREEN = auto()
+    SKATE = auto()
+
+    @property
+    def sprite_location(self):
+        return {
+            self.FREE: (32, 13),
+            self.BRICK: (32, 0),
+            self.BRICK_RIGHT: (33, 8),
+            self.BRICK_BOTTOM: (34, 8),
+            self.BRICK_LEFT: (35, 8),
+            self.BRICK_TOP: (36, 8),
+            self.CONCRETE: (32, 2),
+            self.GREEN: (34, 4),
+            self.SKATE: (36, 4)
+        }[self]
+
+    @property
+    def is_draw_over(self):
+        return self == self.GREEN
+
+    @property
+    def can_tank_run_here(self):
+        return self in (
+            self.FREE,
+            self.SKATE,
+            self.GREEN
+        )
+
+    @property
+    def solid(self):
+        return self in (
+            self.BRICK,
+            self.BRICK_TOP,
+            self.BRICK_LEFT,
+            self.BRICK_BOTTOM,
+            self.BRICK_RIGHT,
+            self.CONCRETE
+        )
+
+    @property
+    def brick(self):
+        return self in (
+            self.BRICK,
+            self.BRICK_TOP,
+            self.BRICK_BOTTOM,
+            self.BRICK_LEFT,
+            self.BRICK_RIGHT
+        )
+
+    @property
+    def is_half_brick(self):
+        return self.brick and self != self.BRICK
+
+    @classmethod
+    def from_symbol(cls, s):
+        return CELL_BY_SYMBOL[s]
+
+    @property
+    def symbol(self):
+        return SYMBOL_BY_CELL[self]
+
+    def calculate_rect(self, x, y, step):
+        half = step // 2
+        if self == self.BRICK_RIGHT:
+            return x + half, y, half, step
+        elif self == self.BRICK_LEFT:
+            return x, y, half, step
+        elif self == self.BRICK_BOTTOM:
+            return x, y + half, step, half
+        elif self == self.BRICK_TOP:
+            return x, y, step, half
+        else:
+            return x, y, step, step
+
+
+CELL_BY_SYMBOL = {
+    '_': CellType.FREE,
+    'B': CellType.BRICK,
+    'C': CellType.CONCRETE,
+    'S': CellType.SKATE,
+    'G': CellType.GREEN,
+    'l': CellType.BRICK_LEFT,
+    't': CellType.BRICK_TOP,
+    'b': CellType.BRICK_BOTTOM,
+    'r': CellType.BRICK_RIGHT
+}
+
+SYMBOL_BY_CELL = {cell: symbol for symbol, cell in CELL_BY_SYMBOL.items()}
+
+SOLID_CELLS = frozenset(c for c in CellType if c.solid)
+
+# where tanks can't go, by half-cells: (bits of the top half-row, bits of the bottom one),
+# bit 0 is the left half-column, bit 1 is the right one; must agree with calculate_rect
+BLOCKING_MASKS = {
+    CellType.FREE: (0b00, 0b00),
+    CellType.BRICK: (0b11, 0b11),
+    CellType.BRICK_RIGHT: (0b10, 0b10),
+    CellType.BRICK_BOTTOM: (0b00, 0b11),
+    CellType.BRICK_LEFT: (0b01, 0b01),
+    CellType.BRICK_TOP: (0b11, 0b00),
+    CellType.CONCRETE: (0b11, 0b11),
+    CellType.GREEN: (0b00, 0b00),
+    CellType.SKATE: (0b00, 0b00),
+}
@@ -0,0 +1,195 @@
+"""
+Text view of a running game for terminals without a display.
+
+Every cell of the field is two characters of the terminal (the characters are about
+twice as high as wide). The view is drawn from the game state, not from the sprites,
+so it needs neither pygame surfaces nor the atlas; only the cells which changed since
+the last frame are written, at most max_fps times per second.
+
+    python3 cli.py headless --seed 1 --text
+    python3 cli.py replay game.json --text --speed 2
+"""
+import time
+
+from terrain import CellType
+from tank import Tank
+from bonus import BonusType
+from util import Direction
+
+
+CELL_TEXT = {
+    CellType.FREE: '  ',
+    CellType.BRICK: '##',
+    CellType.BRICK_RIGHT: ' #',
+    CellType.BRICK_LEFT: '# ',
+    CellType.BRICK_TOP: '""',
+    CellType.BRICK_BOTTOM: '__',
+    CellType.CONCRETE: '[]',
+    CellType.GREEN: '::',
+    CellType.SKATE: '~~',
+}
+
+TANK_TEXT = {
+    Direction.UP: '^^',
+    Direction.DOWN: 'vv',
+    Direction.LEFT: '<<',
+    Direction.RIGHT: '>>',
+}
+
+BONUS_TEXT = {
+    BonusType.CASK: 'Cc',
+    BonusType.TIMER: 'Tt',
+    BonusType.STIFF_BASE: 'Ss',
+    BonusType.UPGRADE: 'Uu',
+    BonusType.DESTRUCTION: 'Dd',
+    BonusType.TOP_TANK: 'Kk',
+    BonusType.GUN: 'Gg',
+}
+
+SPAWN_TEXT = '++'
+PROJECTILE_TEXT = '()'
+BASE_TEXT = 'EE'
+BROKEN_BASE_TEXT = 'xx'
+
+# color pairs: (name, foreground); the background is the terminal's
+COLORS = (
+    ('brick', 'RED'),
+    ('concrete', 'WHITE'),
+    ('green', 'GREEN'),
+    ('skate', 'CYAN'),
+    ('friend', 'YELLOW'),
+    ('enemy', 'WHITE'),
+    ('bonus_tank', 'MAGENTA'),
+    ('projectile', 'YELLOW'),
+    ('bonus', 'MAGENTA'),
+    ('base', 'CYAN'),
+)
+
+CELL_COLOR = {
+    CellType.BRICK: 'brick',
+    CellType.BRICK_RIGHT: 'brick',
+    CellType.BRICK_LEFT: 'brick',
+    CellType.BRICK_TOP: 'brick',
+    CellType.BRICK_BOTTOM: 'brick',
+    CellType.CONCRETE: 'concrete',
+    CellType.GREEN: 'green',
+    CellType.SKATE: 'skate',
+}
+
+
+class TextView:
+    DEFAULT_FPS = 10
+
+    def __init__(self, window, max_fps=DEFAULT_FPS):
+        """
+        :param window: curses window, usually the one curses.wrapper gives
+        """
+        import curses
+        self.window = window
+        self.min_interval = 1 / max_fps
+        self._last_draw = None
+        self._shown = {}  # (row, col) on the terminal -> (text, attr)
+        self.frames = 0
+        self.changed_cells = 0  # written to the terminal, for all frames
+
+        self._attrs = {}
+        if curses.has_colors():
+            curses.start_color()
+            curses.use_default_colors()
+            for i, (name, color) in enumerate(COLORS, start=1):
+                curses.init_pair(i, getattr(curses, 'COLOR_' + color), -1)
+                self._attrs[name] = curses.color_pair(i)
+        self._attrs['friend'] = self._attrs.get('friend', 0) | curses.A_BOLD
+        self._bold = curses.A_BOLD
+        window.nodelay(True)
+        curses.curs_set(0)
+
+    def attr(self, name):
+        return self._attrs.get(name, 0)
+
+    def visible_cells(self, game):
+        """:return: col, row, cols, rows of the field cells which fit the terminal, around the player"""
+        height, width = self.window.getmaxyx()
+        field = game.field
+        cols = min(field.width, width // 2)
+        rows = min(field.height, height - 1)  # the last line is the status
+        col0 = row0 = 0
+        if game.my_tank is not None:
+            c, r = field.map.col_row_from_coords(*game.my_tank.position)
+            col0 = min(max(c - cols // 2, 0), field.width - cols)
+            row0 = min(max(r - rows // 2, 0), field.height - rows)
+        return col0, row0, cols, rows
+
+    def build(self, game, col0, row0, cols, rows):
+        """:return: {(col, row): (text, attr)} for the visible part of the field"""
+        field_map = game.field.map
+        cells = {}
+        for col in range(col0, col0 + cols):
+            for row in range(row0, row0 + rows):
+                cell = field_map.get_cell_by_col_row(col, row)
+                cells[col, row] = CELL_TEXT.get(cell, '??'), self.attr(CELL_COLOR.get(cell))
+
+        def put(x, y, text, attr, size=1):
+            # x, y - top left corner in the game coordinates, size in cells
+            c, r = field_map.col_row_from_coords(x, y)
+            for dc in range(size):
+                for dr in range(size):
+                    if (c + dc, r + dr) in cells:
+                        cells[c + dc, r + dr] = text, attr
+
+        step = field_map.step
+        base = game.my_base
+        put(*base.position, BROKEN_BASE_TEXT if base.broken else BASE_TEXT, self.attr('base'), 2)
+        for bonus in game.bonuses:
+            put(*bonus.position, BONUS_TEXT.get(bonus.type, '$$'), self.attr('bonus') | self._bold, 2)
+        for tank in game.tanks:
+            x, y = tank.position
+            if tank.is_spawning:
+                text, attr = SPAWN_TEXT, 0
+            else:
+                text = TANK_TEXT[tank.direction]
+                if tank.fraction == Tank.FRIEND:
+                    attr = self.attr('friend')
+                else:
+                    attr = self.attr('bonus_tank' if tank.is_bonus else 'enemy')
+            put(x - step, y - step, text, attr, 2)
+        for projectile in game.projectiles:
+            put(*projectile.position, PROJECTILE_TEXT, self.attr('projectile') | self._bold)
+        return cells
+
+    def status(self, game):
+        enemies_left = game.ai.enemies_left_to_spawn
+        level = game.level.name if game.level else '-'
+        text = (f'{level}  score {game.score}  enemies left {enemies_left if enemies_left is not None else "-"}'
+                f'  on field {len(game.ai.all_enemies)}')
+        if game.is_game_over:
+            text += '  GAME OVER'
+        return text
+
+    def render(self, game, force=False):
+        now = time.perf_counter()
+        if not force and self._last_draw is not None and now - self._last_draw < self.min_interval:
+            return
+        self._last_draw = now
+
+        col0, row0, cols, rows = self.visible_cells(game)
+        cells = self.build(game, col0, row0, cols, rows)
+        window = self.window
+        shown = self._shown
+        if len(shown) != len(cells):  # the terminal was resized
+            window.erase()
+            shown.clear()
+
+        for (col, row), value in cells.items():
+            key = row - row0, (col - col0) * 2
+            if shown.get(key) != value:
+                shown[key] = value
+                text, attr = value
+                window.addstr(*key, text, attr)
+                self.changed_cells += 1
+
+        height, width = window.getmaxyx()
+        status = self.status(game)[:width - 1]
+        window.addstr(min(rows, height - 1), 0, status.ljust(width - 1))
+        window.refresh()
+        self.frames += 1
@@ -1,18 +1,42 @@
 import pygame
-from config import ATLAS, GAME_WIDTH, GAME_HEIGHT
+from collections import OrderedDict
+from config import ATLAS, CELL_SIZE, GAME_WIDTH, GAME_HEIGHT
 from util import GameObject
 
 
+class TextCache:
+    """
+    Rendered text surfaces by (text, color), the least recently used ones are dropped
+    """
+    def __init__(self, font: pygame.font.Font, max_size=64):
+        self.font = font
+        self.max_size = max_size
+        self._surfaces = OrderedDict()
+
+    def render(self, text, color=(255, 255, 255)) -> pygame.Surface:
+        key = text, color
+        surface = self._surfaces.get(key)
+        if surface is None:
+            surface = self._surfaces[key] = self.font.render(text, 1, color)
+            if len(self._surfaces) > self.max_size:
+                self._surfaces.popitem(last=False)
+        else:
+            self._surfaces.move_to_end(key)
+        return surface
+
+
 class GameOverLabel(GameObject):
     def __init__(self):
         super().__init__()
-        self._image = ATLAS().image_at(36, 23, 4, 2)
-        size = ATLAS().real_sprite_size
+        size = CELL_SIZE
         self.size = (size * 4, size * 2)
+        # it is drawn over the upscaled field, in the window pixels
+        self._image = ATLAS().image_at(36, 23, 4, 2)
+        if self._image.get_size() != self.size:
+            self._image = pygame.transform.scale(self._image, self.size)
 
-    def place_at_center(self, go: GameObject):
-        x, y = go.position
-        w, h = go.size
+    def place_at_center(self, rect):
+        x, y, w, h = rect
         self.position = x + (w - self.size[0]) // 2, y + (h - self.size[1]) // 2 + 2
 
     def render(self, screen):
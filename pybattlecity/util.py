@@ -1,9 +1,11 @@
 import time
 from collections import OrderedDict
 from enum import Enum
-from pygame import Surface
+import heapq
 import random
 import itertools
+import threading
+from math import ceil, floor
 
 
 DEMO_COLORS = list(itertools.product(*([(0, 128, 255)] * 3)))[1:]
@@ -19,22 +21,148 @@ class Direction(Enum):
 
     @property
     def vector(self):
-        return {
-            self.UP: (0, -1),
-            self.DOWN: (0, 1),
-            self.LEFT: (-1, 0),
-            self.RIGHT: (1, 0)
-        }[self]
+        return _DIRECTION_VECTORS[self.value]
 
     @classmethod
-    def random(cls):
-        return random.choice(list(cls))
+    def random(cls, rng=random):
+        return rng.choice(list(cls))
 
     @classmethod
     def all(cls):
         return set(cls)
 
 
+_DIRECTION_VECTORS = {
+    Direction.UP.value: (0, -1),
+    Direction.DOWN.value: (0, 1),
+    Direction.LEFT.value: (-1, 0),
+    Direction.RIGHT.value: (1, 0),
+}
+
+
+class Scheduler:
+    """
+    Game clock and a heap of pending timers.
+    advance() moves the clock (by real time or by a fixed step per tick) and fires only
+    the timers which expired, so the cost does not depend on the number of live timers.
+    Timers and animators use the scheduler which is current for the thread at their creation.
+    With tick_scale N one advance() is N fixed steps: tanks and projectiles move N times as far.
+    """
+    MAX_REAL_STEP = 0.25  # seconds; longer pauses (loading, dragging the window) are cut
+
+    _local = threading.local()
+
+    def __init__(self, fixed_step=None, tick_scale=1):
+        self.fixed_step = fixed_step
+        self.tick_scale = tick_scale
+        self.now = 0.0
+        self._last_real_time = None
+        self._queue = []
+        self._seq = itertools.count()
+
+    @classmethod
+    def current(cls) -> 'Scheduler':
+        scheduler = getattr(cls._local, 'scheduler', None)
+        if scheduler is None:
+            scheduler = cls._local.scheduler = Scheduler()
+        return scheduler
+
+    def activate(self):
+        Scheduler._local.scheduler = self
+
+    def advance(self):
+        if self.fixed_step is not None:
+            self.now += self.fixed_step * self.tick_scale
+        else:
+            real_time = time.monotonic()
+            if self._last_real_time is not None:
+                self.now += min(real_time - self._last_real_time, self.MAX_REAL_STEP)
+            self._last_real_time = real_time
+        self.run()
+
+    def schedule(self, timer: 'Timer', expiry):
+        heapq.heappush(self._queue, (expiry, next(self._seq), timer, timer.generation))
+
+    def run(self):
+        queue, now = self._queue, self.now
+        while queue and queue[0][0] < now:
+            _, _, timer, generation = heapq.heappop(queue)
+            if generation == timer.generation:
+                timer.expire()
+
+    def __len__(self):
+        return len(self._queue)
+
+
+class TickPacer:
+    """
+    Fixed steps due by the real clock, for a loop which simulates ticks and draws frames:
+        for _ in pacer.ticks():
+            game.update()
+        game.render(screen)
+    scale is the game time per real time (fast-forward, slow motion), None is uncapped:
+    ticks are given for frame_time of the real time, then a frame is drawn.
+    Everything in the game runs on the ticks, so it all scales the same way.
+    """
+    SCALES = (0.25, 0.5, 1, 2, 4, 8, 16, None)
+
+    def __init__(self, step, scale=1, frame_time=1 / 30):
+        """
+        :param step: game time of one tick, None when the game follows the real time (one tick per frame)
+        """
+        self.step = step
+        self.frame_time = frame_time
+        self.scale = scale
+        self._accumulator = step or 0.0  # the first frame shows the first tick
+        self._last = None
+
+    @property
+    def scale(self):
+        return self._scale
+
+    @scale.setter
+    def scale(self, scale):
+        if scale not in self.SCALES and (scale is None or not self.SCALES[0] <= scale <= self.SCALES[-2]):
+            raise ValueError(f'time scale must be from {self.SCALES[0]} to {self.SCALES[-2]} or None')
+        if scale != 1 and self.step is None:
+            raise ValueError('time scale needs a fixed step')
+        self._scale = scale
+
+    def faster(self):
+        return self._shift(1)
+
+    def slower(self):
+        return self._shift(-1)
+
+    def _shift(self, d):
+        scales = self.SCALES
+        i = scales.index(self._scale) if self._scale in scales else scales.index(1)
+        self.scale = scales[min(max(i + d, 0), len(scales) - 1)]
+        return self.scale
+
+    def ticks(self):
+        """yields once per tick due since the last call"""
+        now = time.perf_counter()
+        last, self._last = self._last, now
+        if self.step is None:
+            yield
+            return
+        if self._scale is None:
+            self._accumulator = 0.0
+            deadline = now + self.frame_time
+            yield
+            while time.perf_counter() < deadline:
+                yield
+            self._last = time.perf_counter()
+            return
+        if last is not None:
+            # as Scheduler: long pauses are cut, a slow machine plays slower instead of catching up forever
+            self._accumulator += min(now - last, Scheduler.MAX_REAL_STEP) * self._scale
+        while self._accumulator >= self.step:
+            self._accumulator -= self.step
+            yield
+
+
 class Animator:
     def __init__(self, delay=0.1, max_states=5, once=False):
         self.max_states = max_states
@@ -42,11 +170,13 @@ class Animator:
         self.state = 0
         self.once = once
         self.done = False
-        self.last_time = time.monotonic()
+        self.clock = Scheduler.current()
+        self.last_time = self.clock.now
 
     def __call__(self):
-        if self.last_time + self.delay < time.monotonic():
-            self.last_time = time.monotonic()
+        now = self.clock.now
+        if self.last_time + self.delay < now:
+            self.last_time = now
             self.state += 1
             if self.state >= self.max_states:
                 if self.once:
@@ -61,34 +191,56 @@ class Animator:
 
 
 class Timer(Animator):
-    def __init__(self, delay, paused=True):
+    """
+    One-shot timer driven by the Scheduler: tick() only reads the flag set on expiry.
+    callback is called when the timer expires.
+    """
+    def __init__(self, delay, paused=True, callback=None):
         super().__init__(delay, 1, once=True)
-        if paused:
-            self.done = True
+        self.callback = callback
+        self.generation = 0
+        self.done = True
+        if not paused:
+            self.start()
 
     def start(self):
         self.done = False
         self.state = 0
-        self.last_time = time.monotonic()
+        self.last_time = self.clock.now
+        self.generation += 1
+        self.clock.schedule(self, self.last_time + self.delay)
+
+    def expire(self):
+        self.state = 1
+        self.done = True
+        if self.callback:
+            self.callback()
+
+    def __call__(self):
+        return self.state
 
     def tick(self):
-        if not self.done:
-            self()
         return self.done
 
     def stop(self):
         self.done = True
+        self.generation += 1  # forget the scheduled expiry
+
+    @property
+    def remaining(self):
+        return 0.0 if self.done else max(0.0, self.last_time + self.delay - self.clock.now)
 
 
 class ArmedTimer(Timer):
-    def __init__(self, delay):
-        super().__init__(delay, paused=False)
+    def __init__(self, delay, callback=None):
+        super().__init__(delay, paused=False, callback=callback)
 
 
 class GameObject:
     def __init__(self):
         self._parent = None
         self._children = OrderedDict()
+        self._total = 1  # this object and all its descendants
         self._position = (0, 0)
         self.size = (0, 0)
 
@@ -115,25 +267,39 @@ class GameObject:
         return id(self)
 
     def __iter__(self):
-        return iter(OrderedDict(self._children))
+        return iter(list(self._children))  # a copy: the children may be removed on the way
 
     def __getitem__(self, item):
         return self._children[item]
 
+    def _grow(self, n):
+        node = self
+        while node is not None:
+            node._total += n
+            node = node._parent
+
     def add_child(self, child: 'GameObject'):
         child._parent = self
-        self._children[child] = 1
+        if child not in self._children:
+            self._children[child] = 1
+            self._grow(child._total)
 
     def remove_child(self, child):
         del self._children[child]
+        self._grow(-child._total)
 
     def remove_from_parent(self):
         if self._parent is not None:
             self._parent.remove_child(self)
             self._parent = None
 
-    def visit(self, screen: Surface):
-        self.render(screen)
+    def visit(self, screen):
+        """
+        :param screen: Camera; objects with a size are not rendered when out of its view
+        """
+        w, h = self.size
+        if not (w or h) or screen.sees(self.bounding_rect):
+            self.render(screen)
         for child in list(self._children.keys()):
             child.visit(screen)
 
@@ -142,7 +308,7 @@ class GameObject:
 
     @property
     def total_children(self):
-        return 1 + sum(child.total_children for child in self._children)
+        return self._total
 
 
 def trim_rect(rect, amount):
@@ -175,6 +341,28 @@ def point_in_rect(px, py, rect):
     return x < px < x + w and y < py < y + h
 
 
+def first_step_in_rect(px, py, vx, vy, steps, rect):
+    """
+    A point moves from (px, py) by (vx, vy) per step, along an axis (vx or vy is 0).
+    :return: the first step 1..steps after which it is inside the rect (as point_in_rect), None if none
+    """
+    x, y, w, h = rect
+    if vx:
+        if not y < py < y + h:
+            return None
+        p, v, lo, hi = px, vx, x, x + w
+    else:
+        if not x < px < x + w:
+            return None
+        p, v, lo, hi = py, vy, y, y + h
+    if v < 0:
+        p, v, lo, hi = -p, -v, -hi, -lo
+    # lo < p + k * v < hi
+    first = max(1, floor((lo - p) / v) + 1)
+    last = min(steps, ceil((hi - p) / v) - 1)
+    return first if first <= last else None
+
+
 def point_in_rect_eq(px, py, rect):
     x, y, w, h = rect
     return x <= px <= x + w and y <= py <= y + h
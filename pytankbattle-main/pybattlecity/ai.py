@@ -3,49 +3,7 @@ from field import Field
 from util import ArmedTimer, GameObject
 import random
 from itertools import cycle
-import heapq
-
-def heuristic(a, b):
-    return abs(a[0] - b[0]) + abs(a[1] - b[1])
-
-def neighbors(cell, field_map):
-    x, y = cell
-    for dx, dy, dir in ((1,0,Direction.RIGHT), (-1,0,Direction.LEFT), (0,1,Direction.DOWN), (0,-1,Direction.UP)):
-        nx, ny = x+dx, y+dy
-        if 0 <= nx < field_map.width and 0 <= ny < field_map.height:
-            val = field_map.cells[ny][nx]
-            if val is None:
-                yield (nx, ny, dir)
-
-
-def a_star(start, goal, field_map):
-    frontier = []
-    heapq.heappush(frontier, (0, start))
-    came_from = {start: None}
-    cost_so_far = {start: 0}
-
-    while frontier:
-        _, current = heapq.heappop(frontier)
-        if current == goal:
-            break
-        for nx, ny, dir in neighbors(current, field_map):
-            new_cost = cost_so_far[current] + 1
-            if (nx, ny) not in cost_so_far or new_cost < cost_so_far[(nx, ny)]:
-                cost_so_far[(nx, ny)] = new_cost
-                priority = new_cost + heuristic((nx, ny), goal)
-                heapq.heappush(frontier, (priority, (nx, ny)))
-                came_from[(nx, ny)] = (current, dir)
-
-    current = goal
-    path = []
-    while current != start:
-        prev = came_from.get(current)
-        if not prev:
-            return []
-        current, dir = prev
-        path.append(dir)
-    path.reverse()
-    return path
+from path_planner import PathPlanner
 
 class TankAI:
     SPAWNING_DELAY = 1.5
@@ -55,9 +13,10 @@ class TankAI:
     def dir_delay():
         return random.uniform(0.3, 1.0)
 
-    def __init__(self, tank: Tank, field: Field):
+    def __init__(self, tank: Tank, field: Field, planner: PathPlanner):
         self.tank = tank
         self.field = field
+        self.planner = planner
 
         self.fire_timer = ArmedTimer(delay=self.FIRE_TIMER)
         self.dir_timer = ArmedTimer(delay=self.dir_delay())
@@ -95,13 +54,15 @@ class TankAI:
         if c1 == c2:
             step = 1 if r2 > r1 else -1
             for r in range(r1 + step, r2, step):
-                if map.cells[r][c1] is not None:
+                cell = map.get_cell_by_col_row(c1, r)
+                if cell is not None and cell.solid:
                     return False
             return True
         elif r1 == r2:
             step = 1 if c2 > c1 else -1
             for c in range(c1 + step, c2, step):
-                if map.cells[r1][c] is not None:
+                cell = map.get_cell_by_col_row(c, r1)
+                if cell is not None and cell.solid:
                     return False
             return True
         return False
@@ -114,21 +75,33 @@ class TankAI:
         else:
             self.tank.direction = Direction.DOWN if ty > y else Direction.UP
 
-    def pick_direction(self):
-        c, r = self.field.map.col_row_from_coords(*self.tank.position)
+    def path_goals(self):
         targets = []
         if hasattr(self.field, 'my_base') and self.field.my_base and not self.field.my_base.broken:
-            bx, by = self.field.map.col_row_from_coords(*self.field.my_base.position)
-            targets.append((bx, by))
+            targets.append(self.cell_of(self.field.my_base.center_point))
         if hasattr(self.field, 'game') and self.field.game.my_tank:
-            tx, ty = self.field.map.col_row_from_coords(*self.field.game.my_tank.position)
-            targets.append((tx, ty))
-
-        for goal in targets:
-            path = a_star((c, r), goal, self.field.map)
-            if path:
-                return path[0]
+            targets.append(self.cell_of(self.field.game.my_tank.position))
+        return targets
+
+    def cell_of(self, point):
+        """:return: col, row of the top-left cell of a 2 x 2 object centered at the point"""
+        c, r = self.field.map.col_row_from_coords(*point)
+        return c - 1, r - 1
+
+    def request_path(self):
+        """
+        ask the planner for a path to the targets, the tank keeps its heading until the answer
+        :return: False if there is nothing to go to
+        """
+        goals = self.path_goals()
+        if not goals:
+            return False
+        start = self.cell_of(self.tank.position)
+        self.planner.request(self, start, goals)
+        return True
 
+    def pick_direction(self):
+        c, r = self.field.map.col_row_from_coords(*self.tank.position)
         prohibited_dir = set()
         if c <= 1: prohibited_dir.add(Direction.LEFT)
         if r <= 1: prohibited_dir.add(Direction.UP)
@@ -166,17 +139,23 @@ class TankAI:
                 self.tank.fire()
                 self.fire_timer.start()
 
+        path = self.planner.take_result(self)
+        if path is not None:
+            self.tank.direction = path[0] if path else self.pick_direction()
+
         if self.dir_timer.tick():
-            self.tank.direction = self.pick_direction()
+            if not self.request_path():
+                self.tank.direction = self.pick_direction()
             self.dir_timer.delay = self.dir_delay()
             self.dir_timer.start()
 
-        prev_pos = self.tank.position
-        self.tank.move_tank(self.tank.direction)
-
-        if self.tank.position == prev_pos:
+        if self.tank.moving and self.tank.position == self.tank.old_position:
+            # the game undid the last move, stuck: turn at once, the planned path comes later
             self.tank.direction = self.pick_direction()
-            self.tank.move_tank(self.tank.direction)
+            if not self.planner.is_waiting(self):
+                self.request_path()
+
+        self.tank.move_tank(self.tank.direction)
 
     def reset(self):
         self.tank.direction = Direction.random()
@@ -190,6 +169,8 @@ class EnemyFractionAI:
 
         self.spawn_points = { (x, y): None for x, y in field.respawn_points(True) }
 
+        self.planner = PathPlanner(field)
+
         self.dynamic_timer = ArmedTimer(5.0)
 
         self.spawn_increment = 3
@@ -228,7 +209,7 @@ class EnemyFractionAI:
         t_type = next(self._enemy_queue_iter)
         new_tank = Tank(Tank.ENEMY, Tank.Color.PLAIN, t_type)
         new_tank.is_spawning = True
-        new_tank.ai = TankAI(new_tank, self.field)
+        new_tank.ai = TankAI(new_tank, self.field, self.planner)
 
         if random.uniform(0, 1) > 0.35:
             new_tank.is_bonus = True
@@ -279,6 +260,9 @@ class EnemyFractionAI:
         for enemy_tank in self.all_enemies:
             self.update_one_tank(enemy_tank)
 
+        # the paths asked for in this tick are searched while the next frames run
+        self.planner.update()
+
     def update_one_tank(self, t: Tank):
         t.to_destroy = False
         t.ai.update()
@@ -30,6 +30,11 @@ class DiscreteMap:
         row = floor((y - ys) / self.step)
         return col, row
 
+    @property
+    def columns(self):
+        """raw cells: columns[col][row]"""
+        return self._cells
+
     def inside_col_row(self, col, row):
         return 0 <= col < self.width and 0 <= row < self.height
 
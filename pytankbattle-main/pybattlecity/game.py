@@ -35,6 +35,10 @@ class Game:
         self.my_base.position = self.field.map.coord_by_col_and_row(12, 24)
         self.scene.add_child(self.my_base)
 
+        # the enemy AI finds its targets (base, player) through the field
+        self.field.my_base = self.my_base
+        self.field.game = self
+
         # tanks
         self.tanks = GameObject()
         self.scene.add_child(self.tanks)
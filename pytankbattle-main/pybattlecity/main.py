@@ -3,6 +3,7 @@ from pygame.locals import *
 from game import Game
 from config import *
 from util import Direction
+import path_planner
 
 
 if __name__ == '__main__':
@@ -49,4 +50,5 @@ if __name__ == '__main__':
 
         pygame.display.flip()
 
+    path_planner.shutdown()
     pygame.quit()
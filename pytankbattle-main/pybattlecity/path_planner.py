@@ -0,0 +1,93 @@
+"""
+Path planning for the enemy tanks off the main thread.
+
+The search runs in a worker process on a snapshot of the terrain, the tanks get
+the result on a later tick and keep their current heading until then.
+The search itself is in path_search.py.
+"""
+import os
+import signal
+import weakref
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from path_search import TerrainSnapshot, plan_path
+
+
+PLANNER_WORKERS = 2
+WORKER_NICENESS = 5  # the game loop goes first when there are not enough cores
+
+
+def plan_paths(snapshot, jobs):
+    return [plan_path(snapshot, start, goals) for start, goals in jobs]
+
+
+def _init_worker():
+    # forked from the game: SDL's SIGTERM handler would keep the pool from terminating a worker
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if hasattr(os, 'nice'):
+        os.nice(WORKER_NICENESS)
+
+
+_executor = None
+
+
+def get_executor():
+    # one pool for the whole run: games come and go, the worker processes stay
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(PLANNER_WORKERS, initializer=_init_worker)
+    return _executor
+
+
+def shutdown():
+    """stop the worker processes when the game exits, the next request would start a new pool"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+class PathPlanner:
+    def __init__(self, field):
+        self.field = field
+        # keyed by the requester (TankAI): destroyed tanks drop out by themselves
+        self._requests = weakref.WeakKeyDictionary()  # requester -> (start, goals)
+        self._running = weakref.WeakKeyDictionary()  # requester -> (Future, index of its path)
+
+    def request(self, requester, start, goals):
+        """a newer request of the same requester replaces the one not sent yet"""
+        self._requests[requester] = (start, goals)
+
+    def is_waiting(self, requester):
+        return requester in self._requests or requester in self._running
+
+    def take_result(self, requester):
+        """:return: the path if it is ready, else None"""
+        future, i = self._running.get(requester, (None, 0))
+        if future is None or not future.done():
+            return None
+        del self._running[requester]
+        try:
+            return future.result()[i]
+        except (BrokenProcessPool, CancelledError):
+            # the worker died or the pool was shut down: no path this time, the tank asks again later;
+            # any other error is a bug in the search and goes up
+            return []
+
+    def update(self):
+        """send the requests of this tick to a worker in one job with one terrain snapshot"""
+        # one search per tank at a time, a newer request waits for the next tick
+        requesters = [r for r in self._requests.keys() if r not in self._running]
+        if not requesters:
+            return
+        jobs = [self._requests.pop(r) for r in requesters]
+        snapshot = TerrainSnapshot.of_map(self.field.map)
+        try:
+            future = get_executor().submit(plan_paths, snapshot, jobs)
+        except BrokenProcessPool:
+            # a worker was killed (e.g. out of memory): start a new pool
+            shutdown()
+            future = get_executor().submit(plan_paths, snapshot, jobs)
+        for i, r in enumerate(requesters):
+            self._running[r] = (future, i)
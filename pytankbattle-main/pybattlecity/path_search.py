@@ -0,0 +1,94 @@
+"""
+A* over the cells where a tank fits, on a snapshot of the terrain.
+
+Only util.Direction and the public map interface (width, height, columns) are used:
+pybattlecity's path_planner loads this file too, so both programs search the same way.
+"""
+import heapq
+
+from util import Direction
+
+
+def heuristic(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def neighbors(cell, field_map):
+    x, y = cell
+    for dx, dy, dir in ((1,0,Direction.RIGHT), (-1,0,Direction.LEFT), (0,1,Direction.DOWN), (0,-1,Direction.UP)):
+        nx, ny = x+dx, y+dy
+        if 0 <= nx < field_map.width and 0 <= ny < field_map.height:
+            val = field_map.cells[ny][nx]
+            if val is None:
+                yield (nx, ny, dir)
+
+
+def a_star(start, goal, field_map):
+    frontier = []
+    heapq.heappush(frontier, (0, start))
+    came_from = {start: None}
+    cost_so_far = {start: 0}
+
+    while frontier:
+        _, current = heapq.heappop(frontier)
+        if current == goal:
+            break
+        for nx, ny, dir in neighbors(current, field_map):
+            new_cost = cost_so_far[current] + 1
+            if (nx, ny) not in cost_so_far or new_cost < cost_so_far[(nx, ny)]:
+                cost_so_far[(nx, ny)] = new_cost
+                priority = new_cost + heuristic((nx, ny), goal)
+                heapq.heappush(frontier, (priority, (nx, ny)))
+                came_from[(nx, ny)] = (current, dir)
+
+    current = goal
+    path = []
+    while current != start:
+        prev = came_from.get(current)
+        if not prev:
+            return []
+        current, dir = prev
+        path.append(dir)
+    path.reverse()
+    return path
+
+
+class TerrainSnapshot:
+    """
+    Picklable copy of the terrain for a_star: cells[row][col] is None where a tank
+    (2 x 2 cells from its top-left cell) can stand.
+    """
+    __slots__ = ('width', 'height', 'cells')
+
+    def __init__(self, width, height, cells):
+        self.width = width
+        self.height = height
+        self.cells = cells
+
+    def __getstate__(self):
+        return self.width, self.height, self.cells
+
+    def __setstate__(self, state):
+        self.width, self.height, self.cells = state
+
+    @classmethod
+    def of_map(cls, field_map):
+        w, h = field_map.width, field_map.height
+        free = [[c is not None and c.can_tank_run_here for c in column] for column in field_map.columns]
+        cells = tuple(
+            tuple(None if col + 1 < w and row + 1 < h and
+                  free[col][row] and free[col + 1][row] and free[col][row + 1] and free[col + 1][row + 1]
+                  else 1
+                  for col in range(w))
+            for row in range(h)
+        )
+        return cls(w, h, cells)
+
+
+def plan_path(snapshot, start, goals):
+    """:return: path to the first reachable goal as a list of directions, [] if there is none"""
+    for goal in goals:
+        path = a_star(start, goal, snapshot)
+        if path:
+            return path
+    return []